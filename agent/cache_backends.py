@@ -0,0 +1,281 @@
+import os
+import sqlite3
+import threading
+import hashlib
+import tempfile
+from agent.cache_serializers import CacheSerializer
+
+def is_sweepable(cache_data, now, validator_retention=0, fallback_retention=0):
+    """
+    Whether an entry is of no more use at `now`
+
+    An entry is kept through its stale-while-revalidate window. One with
+    HTTP validators is kept a further validator_retention seconds so it can
+    still be revalidated with a conditional request, and a last good payload
+    stored under a negative-cache policy a further fallback_retention seconds
+    so it can still be served when the next fetch fails.
+    """
+    retention = 0
+    if cache_data.get('validators'):
+        retention = validator_retention
+    if cache_data.get('fallback'):
+        retention = max(retention, fallback_retention)
+    return now > max(cache_data['expires_at'], cache_data.get('stale_until', 0)) + retention
+
+class FileCacheBackend:
+    """Stores each cache entry in its own file named after the key's hash"""
+
+    def __init__(self, cache_dir="cache", serializer=None):
+        """
+        Initialize file backend
+
+        Args:
+            cache_dir: Directory to store cache files
+            serializer: CacheSerializer used to encode entries (pretty JSON by default)
+        """
+        self.cache_dir = cache_dir
+        self.serializer = serializer or CacheSerializer()
+
+        # Create cache directory if it doesn't exist
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+    def _get_cache_key(self, key):
+        """Generate a safe filename from cache key"""
+        return hashlib.md5(key.encode()).hexdigest()
+
+    def _get_cache_path(self, key):
+        """Get full path to cache file"""
+        cache_key = self._get_cache_key(key)
+        return os.path.join(self.cache_dir, f"{cache_key}.json")
+
+    def _entry_paths(self):
+        for filename in os.listdir(self.cache_dir):
+            if filename.endswith('.json'):
+                yield os.path.join(self.cache_dir, filename)
+
+    def read(self, key):
+        """Read the entry for a key, or None if there isn't one"""
+        cache_path = self._get_cache_path(key)
+
+        if not os.path.exists(cache_path):
+            return None
+
+        with open(cache_path, 'rb') as f:
+            return self.serializer.loads(f.read())
+
+    def write(self, key, cache_data):
+        """
+        Write the entry for a key
+
+        The entry goes to a temporary file that is then renamed over the old
+        one, so readers in other processes never see a half-written file.
+        """
+        payload = self.serializer.dumps(cache_data)
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(payload)
+            os.replace(temp_path, self._get_cache_path(key))
+        except BaseException:
+            os.remove(temp_path)
+            raise
+
+    def delete(self, key):
+        """Delete the entry for a key; returns True if it existed"""
+        cache_path = self._get_cache_path(key)
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+            return True
+        return False
+
+    def clear_expired(self, now, validator_retention=0, fallback_retention=0):
+        """Delete entries that are sweepable at `now` (see is_sweepable); returns the number deleted"""
+        cleared_count = 0
+        for filepath in self._entry_paths():
+            try:
+                with open(filepath, 'rb') as f:
+                    cache_data = self.serializer.loads(f.read())
+
+                if is_sweepable(cache_data, now, validator_retention, fallback_retention):
+                    os.remove(filepath)
+                    cleared_count += 1
+            except OSError:
+                # Removed or replaced by another process meanwhile
+                continue
+            except Exception:
+                # Writes are atomic, so a file that doesn't parse is corrupt
+                # rather than half-written
+                try:
+                    os.remove(filepath)
+                    cleared_count += 1
+                except OSError:
+                    continue
+
+        return cleared_count
+
+    def clear_all(self):
+        """Delete every entry; returns the number deleted"""
+        cleared_count = 0
+        for filepath in self._entry_paths():
+            os.remove(filepath)
+            cleared_count += 1
+
+        return cleared_count
+
+    def entries(self):
+        """Yield every readable entry"""
+        for filepath in self._entry_paths():
+            try:
+                with open(filepath, 'rb') as f:
+                    yield self.serializer.loads(f.read())
+            except Exception:
+                continue
+
+    def stats(self, now):
+        """Entry count, total bytes and expired entry count"""
+        total_files = 0
+        total_size = 0
+        expired_files = 0
+
+        for filepath in self._entry_paths():
+            total_files += 1
+            total_size += os.path.getsize(filepath)
+
+            try:
+                with open(filepath, 'rb') as f:
+                    cache_data = self.serializer.loads(f.read())
+
+                if now > cache_data['expires_at']:
+                    expired_files += 1
+            except:
+                expired_files += 1
+
+        return total_files, total_size, expired_files
+
+class SQLiteCacheBackend:
+    """
+    Stores all cache entries in one SQLite database in WAL mode
+
+    expires_at is a separate indexed column, so expiry sweeps and stats are
+    single queries instead of a parse of every entry. Each thread uses its
+    own connection; WAL lets readers run alongside a writer, including from
+    other processes sharing the file.
+    """
+
+    def __init__(self, cache_dir="cache", serializer=None, filename="cache.sqlite3"):
+        """
+        Initialize SQLite backend
+
+        Args:
+            cache_dir: Directory holding the database file
+            serializer: CacheSerializer used to encode entries (compact JSON by default)
+            filename: Database file name
+        """
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+        self.path = os.path.join(cache_dir, filename)
+        self.serializer = serializer or CacheSerializer('json-compact')
+        self._local = threading.local()
+
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_entries ("
+            " key TEXT PRIMARY KEY,"
+            " payload BLOB NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " expires_at REAL NOT NULL,"
+            " size INTEGER NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_entries_expires_at ON cache_entries (expires_at)")
+        conn.commit()
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def read(self, key):
+        """Read the entry for a key, or None if there isn't one"""
+        row = self._connection().execute(
+            "SELECT payload FROM cache_entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+
+        # Rows written before serializers were pluggable hold JSON text
+        payload = row[0].encode() if isinstance(row[0], str) else row[0]
+        return self.serializer.loads(payload)
+
+    def write(self, key, cache_data):
+        """Write the entry for a key"""
+        payload = self.serializer.dumps(cache_data)
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (key, payload, created_at, expires_at, size) VALUES (?, ?, ?, ?, ?)",
+                (key, payload, cache_data['created_at'], cache_data['expires_at'], len(payload))
+            )
+
+    def delete(self, key):
+        """Delete the entry for a key; returns True if it existed"""
+        conn = self._connection()
+        with conn:
+            return conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,)).rowcount > 0
+
+    def clear_expired(self, now, validator_retention=0, fallback_retention=0):
+        """Delete entries that are sweepable at `now` (see is_sweepable); returns the number deleted"""
+        conn = self._connection()
+        # Only expired rows can be sweepable; their payloads decide the stale window and validators
+        candidates = conn.execute("SELECT key, payload FROM cache_entries WHERE expires_at < ?", (now,)).fetchall()
+
+        sweepable = []
+        for key, payload in candidates:
+            try:
+                cache_data = self.serializer.loads(payload.encode() if isinstance(payload, str) else payload)
+            except Exception:
+                sweepable.append((key,))
+                continue
+            if is_sweepable(cache_data, now, validator_retention, fallback_retention):
+                sweepable.append((key,))
+
+        with conn:
+            conn.executemany("DELETE FROM cache_entries WHERE key = ?", sweepable)
+        return len(sweepable)
+
+    def clear_all(self):
+        """Delete every entry; returns the number deleted"""
+        conn = self._connection()
+        with conn:
+            return conn.execute("DELETE FROM cache_entries").rowcount
+
+    def entries(self):
+        """Yield every readable entry"""
+        for (payload,) in self._connection().execute("SELECT payload FROM cache_entries").fetchall():
+            try:
+                yield self.serializer.loads(payload.encode() if isinstance(payload, str) else payload)
+            except Exception:
+                continue
+
+    def stats(self, now):
+        """Entry count, total bytes and expired entry count"""
+        total, size, expired = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(expires_at < ?), 0) FROM cache_entries", (now,)
+        ).fetchone()
+        return total, size, expired
+
+CACHE_BACKENDS = {
+    'file': FileCacheBackend,
+    'sqlite': SQLiteCacheBackend
+}
+
+def create_backend(name, cache_dir, serializer=None):
+    """Create a cache backend by name ("file" or "sqlite")"""
+    if name not in CACHE_BACKENDS:
+        raise ValueError(f"Unknown cache backend: {name}")
+    return CACHE_BACKENDS[name](cache_dir, serializer)
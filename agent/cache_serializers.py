@@ -0,0 +1,100 @@
+import gzip
+import json
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Encoded entries other than plain JSON start with MAGIC and a "<format>:<compression>\n" header
+MAGIC = b"\x00JDXC"
+
+FORMATS = ('json', 'json-compact', 'msgpack')
+COMPRESSIONS = ('gzip', 'zstd')
+
+class CacheSerializer:
+    """
+    Encodes cache entries to bytes and back
+
+    Plain "json" without compression writes the same pretty-printed JSON as
+    always, so existing cache files stay readable. Every other combination
+    records its format and compression in a short header, and loads() honours
+    that header whatever the serializer is configured to write.
+    """
+
+    def __init__(self, format="json", compression=None, compress_threshold=4096):
+        """
+        Initialize serializer
+
+        Args:
+            format: "json" (pretty-printed), "json-compact" or "msgpack"
+            compression: None, "gzip" or "zstd"
+            compress_threshold: Only compress encoded entries larger than this many bytes
+        """
+        if format not in FORMATS:
+            raise ValueError(f"Unknown cache format: {format}")
+        if compression is not None and compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown cache compression: {compression}")
+        if format == 'msgpack' and msgpack is None:
+            raise ValueError("The msgpack cache format requires the msgpack package")
+        if compression == 'zstd' and zstandard is None:
+            raise ValueError("zstd cache compression requires the zstandard package")
+
+        self.format = format
+        self.compression = compression
+        self.compress_threshold = compress_threshold
+
+    def dumps(self, entry):
+        """Encode an entry to bytes"""
+        body = _encode(self.format, entry)
+
+        compression = self.compression if self.compression and len(body) > self.compress_threshold else None
+        if compression:
+            body = _compress(compression, body)
+        elif self.format == 'json':
+            return body
+
+        return MAGIC + f"{self.format}:{compression or ''}\n".encode() + body
+
+    def loads(self, raw):
+        """Decode bytes written by any serializer configuration"""
+        if not raw.startswith(MAGIC):
+            return json.loads(raw)
+
+        header, body = raw[len(MAGIC):].split(b"\n", 1)
+        format, compression = header.decode().split(":")
+
+        if compression:
+            body = _decompress(compression, body)
+        return _decode(format, body)
+
+def _encode(format, entry):
+    if format == 'json':
+        return json.dumps(entry, indent=2).encode()
+    if format == 'json-compact':
+        return json.dumps(entry, separators=(',', ':')).encode()
+    return msgpack.packb(entry, use_bin_type=True)
+
+def _decode(format, body):
+    if format == 'msgpack':
+        if msgpack is None:
+            raise ValueError("Cache entry is msgpack-encoded but msgpack isn't installed")
+        return msgpack.unpackb(body, raw=False)
+    return json.loads(body)
+
+def _compress(compression, body):
+    if compression == 'gzip':
+        return gzip.compress(body, compresslevel=6)
+    return zstandard.ZstdCompressor().compress(body)
+
+def _decompress(compression, body):
+    if compression == 'gzip':
+        return gzip.decompress(body)
+    if zstandard is None:
+        raise ValueError("Cache entry is zstd-compressed but zstandard isn't installed")
+    return zstandard.ZstdDecompressor().decompress(body)
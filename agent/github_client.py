@@ -0,0 +1,146 @@
+import os
+import asyncio
+import threading
+import time
+from urllib.parse import urlencode
+from dotenv import load_dotenv
+from agent.http_client import http_get, async_client_scope, conditional_headers
+from agent.cache_manager import cached_request, acached_request, Validated, NOT_MODIFIED
+
+load_dotenv()
+
+GITHUB_SEARCH_URL = "https://api.github.com/search/repositories"
+
+# Seconds a search result is reused before it is revalidated with its ETag
+SEARCH_TTL = 60
+
+class GitHubRateLimitError(Exception):
+    """Raised when the search quota is exhausted and the reset is too far away to wait for"""
+
+class GitHubClient:
+    """
+    GitHub repository search client
+
+    Sends the token when one is configured, caches search results with
+    their ETag and revalidates them with If-None-Match (304 responses don't
+    count against the quota), and tracks the X-RateLimit-* headers so
+    callers can plan their requests.
+    """
+
+    def __init__(self, token=None, max_wait=60):
+        """
+        Initialize GitHub client
+
+        Args:
+            token: Personal access token (defaults to the GITHUB_TOKEN env var)
+            max_wait: Longest time in seconds to sleep for a quota reset
+        """
+        self.token = token if token is not None else os.getenv("GITHUB_TOKEN")
+        self.max_wait = max_wait
+        self.rate_limit = {'limit': None, 'remaining': None, 'reset': None}
+        self._lock = threading.Lock()
+
+    def _search_url(self, query, sort, order, per_page):
+        params = {'q': query, 'sort': sort, 'order': order, 'per_page': per_page}
+        return f"{GITHUB_SEARCH_URL}?{urlencode(params)}"
+
+    def _request_headers(self, validators=None):
+        headers = conditional_headers(validators) if validators else {}
+        if self.token:
+            headers['Authorization'] = f"Bearer {self.token}"
+        return headers
+
+    def _update_rate_limit(self, headers):
+        with self._lock:
+            for name in ('limit', 'remaining', 'reset'):
+                value = headers.get(f"X-RateLimit-{name.title()}")
+                if value is not None:
+                    self.rate_limit[name] = int(value)
+
+    def _handle_response(self, response):
+        """Turn a search response into Validated JSON, or NOT_MODIFIED for a 304"""
+        self._update_rate_limit(response.headers)
+
+        if response.status_code == 304:
+            return NOT_MODIFIED
+
+        if response.status_code == 200:
+            return Validated(response.json(), response.headers.get('ETag'), response.headers.get('Last-Modified'))
+
+        raise Exception(f"HTTP {response.status_code}")
+
+    def affordable_calls(self, wanted):
+        """
+        How many of `wanted` search calls can be made without hitting the limit
+
+        Unknown limits (no request made yet) and passed resets allow all calls.
+        """
+        with self._lock:
+            remaining, reset = self.rate_limit['remaining'], self.rate_limit['reset']
+
+        if remaining is None or (reset is not None and time.time() >= reset):
+            return wanted
+        return min(wanted, remaining)
+
+    def _quota_wait(self):
+        """Seconds to wait before the next search call (0 if quota is left)"""
+        if self.affordable_calls(1):
+            return 0
+
+        wait = self.rate_limit['reset'] - time.time() + 1
+        if wait > self.max_wait:
+            raise GitHubRateLimitError(f"GitHub search quota exhausted, resets in {int(wait)}s")
+
+        print(f"GitHub search quota exhausted, waiting {wait:.0f}s for reset")
+        return wait
+
+    def wait_for_quota(self):
+        """Sleep until the quota resets if it is exhausted (up to max_wait seconds)"""
+        wait = self._quota_wait()
+        if wait:
+            time.sleep(wait)
+
+    def search_repositories(self, query, sort="stars", order="desc", per_page=30, ttl=SEARCH_TTL):
+        """
+        Search repositories
+
+        Args:
+            query: Search query (e.g. "topic:python")
+            sort: Sort field
+            order: Sort order
+            per_page: Results per page (max 100)
+            ttl: Seconds the result is reused before it is revalidated
+
+        Returns:
+            Search response payload
+        """
+        url = self._search_url(query, sort, order, per_page)
+
+        def fetch(validators=None):
+            self.wait_for_quota()
+            return self._handle_response(http_get(url, headers=self._request_headers(validators)))
+
+        data = cached_request(f"github_search:{url}", fetch, ttl, fetch, default_factory=lambda: None)
+        if data is None:
+            raise Exception("search request failed")
+        return data
+
+    async def asearch_repositories(self, query, sort="stars", order="desc", per_page=30, ttl=SEARCH_TTL, client=None):
+        """Async version of search_repositories"""
+        url = self._search_url(query, sort, order, per_page)
+
+        async with async_client_scope(client) as http:
+            async def fetch(validators=None):
+                wait = self._quota_wait()
+                if wait:
+                    await asyncio.sleep(wait)
+                return self._handle_response(await http.get(url, headers=self._request_headers(validators)))
+
+            data = await acached_request(f"github_search:{url}", fetch, ttl, fetch, default_factory=lambda: None)
+
+        if data is None:
+            raise Exception("search request failed")
+        return data
+
+# Global client instance
+github = GitHubClient()
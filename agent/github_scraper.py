@@ -1,50 +1,100 @@
-import requests
+import asyncio
 import json
 import time
 from dotenv import load_dotenv
+from agent.http_client import async_client_scope
+from agent.github_client import github
+from agent.cache_manager import memoize
 
 load_dotenv()
 
+# Seconds results are memoized per distinct arguments
+MEMO_TTL = 1200
+
+DEFAULT_TOPICS = ["javascript", "python", "react", "ai", "machine-learning", "web-development"]
+
+def _repo_title(repo):
+    """Build a display title from a repository's name and description"""
+    return f"{repo['name']} - {repo['description'][:100]}..." if repo['description'] else repo['name']
+
+def _parse_trending(data):
+    """Convert a repository search payload into trending repo dicts"""
+    repos = []
+
+    for repo in data.get('items', []):
+        repos.append({
+            "title": _repo_title(repo),
+            "url": repo['html_url'],
+            "score": repo['stargazers_count'],
+            "source": "github",
+            "language": repo.get('language', 'Unknown'),
+            "stars": repo['stargazers_count'],
+            "forks": repo['forks_count']
+        })
+
+    return repos
+
+def _parse_topic(data, topic):
+    """Convert a repository search payload into topic repo dicts"""
+    repos = []
+
+    for repo in data.get('items', []):
+        repos.append({
+            "title": _repo_title(repo),
+            "url": repo['html_url'],
+            "score": repo['stargazers_count'],
+            "source": "github",
+            "topic": topic,
+            "language": repo.get('language', 'Unknown'),
+            "stars": repo['stargazers_count']
+        })
+
+    return repos
+
+def _parse_developers(data):
+    """Convert a repository search payload into developer dicts"""
+    developers = []
+
+    for repo in data.get('items', []):
+        developers.append({
+            "title": f"{repo['owner']['login']} created {repo['name']}",
+            "url": repo['owner']['html_url'],
+            "score": repo['stargazers_count'],
+            "source": "github",
+            "developer": repo['owner']['login'],
+            "repo_name": repo['name'],
+            "stars": repo['stargazers_count']
+        })
+
+    return developers
+
+def _trending_query(language, period):
+    """Build the search query for trending repos"""
+    query = f"stars:>1 created:>{_get_date_filter(period)}"
+    if language:
+        query += f" language:{language}"
+    return query
+
+def _developers_query():
+    """Build the search query for repos from the last week"""
+    return f"stars:>50 created:>{_get_date_filter('weekly')}"
+
+def _top_by_stars(all_repos, limit):
+    """Sort by stars and return top repos"""
+    all_repos.sort(key=lambda x: x['stars'], reverse=True)
+    return all_repos[:limit]
+
+@memoize(MEMO_TTL, limit_arg='limit')
 def fetch_github_trending(language="", period="daily", limit=5):
     """Fetch trending GitHub repositories"""
     try:
         # GitHub provides trending data through their web interface
         # We'll use the GitHub API to get popular repos
-        
-        headers = {
-            'User-Agent': 'jdx-pulse/1.0 (https://jdxsoftware.com)',
-            'Accept': 'application/vnd.github.v3+json'
-        }
-        
+
         # Use search API to find trending repos
-        query = f"stars:>1 created:>{_get_date_filter(period)}"
-        if language:
-            query += f" language:{language}"
-        
-        url = f"https://api.github.com/search/repositories?q={query}&sort=stars&order=desc&per_page={limit}"
-        
-        response = requests.get(url, headers=headers)
-        
-        if response.status_code == 200:
-            data = response.json()
-            repos = []
-            
-            for repo in data.get('items', []):
-                repos.append({
-                    "title": f"{repo['name']} - {repo['description'][:100]}..." if repo['description'] else repo['name'],
-                    "url": repo['html_url'],
-                    "score": repo['stargazers_count'],
-                    "source": "github",
-                    "language": repo.get('language', 'Unknown'),
-                    "stars": repo['stargazers_count'],
-                    "forks": repo['forks_count']
-                })
-            
-            return repos
-        else:
-            print(f"Error fetching GitHub trending: HTTP {response.status_code}")
-            return []
-            
+        data = github.search_repositories(_trending_query(language, period), per_page=limit)
+        return _parse_trending(data)
+
     except Exception as e:
         print(f"Error fetching GitHub trending: {e}")
         return []
@@ -52,7 +102,7 @@ def fetch_github_trending(language="", period="daily", limit=5):
 def _get_date_filter(period):
     """Get date filter for GitHub API based on period"""
     from datetime import datetime, timedelta
-    
+
     if period == "daily":
         date = datetime.now() - timedelta(days=1)
     elif period == "weekly":
@@ -61,85 +111,90 @@ def _get_date_filter(period):
         date = datetime.now() - timedelta(days=30)
     else:
         date = datetime.now() - timedelta(days=1)
-    
+
     return date.strftime("%Y-%m-%d")
 
+def _plan_topics(topics):
+    """Deduplicate topics and drop any the remaining search quota can't cover"""
+    topics = list(dict.fromkeys(topics))
+    affordable = github.affordable_calls(len(topics))
+
+    if affordable < len(topics):
+        print(f"GitHub search quota covers {affordable} of {len(topics)} topics")
+
+    return topics[:affordable]
+
+@memoize(MEMO_TTL, limit_arg='limit')
 def fetch_github_topics(topics=None, limit=3):
     """Fetch trending repos by topics"""
     if topics is None:
-        topics = ["javascript", "python", "react", "ai", "machine-learning", "web-development"]
-    
+        topics = DEFAULT_TOPICS
+
     all_repos = []
-    
-    for topic in topics[:3]:  # Limit to avoid rate limits
+
+    # Repository search ANDs multiple topic: qualifiers, so each topic needs its own call
+    for topic in _plan_topics(topics):
         try:
-            headers = {
-                'User-Agent': 'jdx-pulse/1.0 (https://jdxsoftware.com)',
-                'Accept': 'application/vnd.github.v3+json'
-            }
-            
-            url = f"https://api.github.com/search/repositories?q=topic:{topic}&sort=stars&order=desc&per_page=2"
-            
-            response = requests.get(url, headers=headers)
-            
-            if response.status_code == 200:
-                data = response.json()
-                
-                for repo in data.get('items', []):
-                    all_repos.append({
-                        "title": f"{repo['name']} - {repo['description'][:100]}..." if repo['description'] else repo['name'],
-                        "url": repo['html_url'],
-                        "score": repo['stargazers_count'],
-                        "source": "github",
-                        "topic": topic,
-                        "language": repo.get('language', 'Unknown'),
-                        "stars": repo['stargazers_count']
-                    })
-                
-                time.sleep(1)  # Rate limiting
-            
+            data = github.search_repositories(f"topic:{topic}", per_page=2)
+            all_repos.extend(_parse_topic(data, topic))
+
         except Exception as e:
             print(f"Error fetching GitHub topic {topic}: {e}")
             continue
-    
-    # Sort by stars and return top repos
-    all_repos.sort(key=lambda x: x['stars'], reverse=True)
-    return all_repos[:limit]
 
+    return _top_by_stars(all_repos, limit)
+
+@memoize(MEMO_TTL, limit_arg='limit')
 def fetch_github_developers(limit=5):
     """Fetch trending developers (based on recent popular repos)"""
     try:
-        headers = {
-            'User-Agent': 'jdx-pulse/1.0 (https://jdxsoftware.com)',
-            'Accept': 'application/vnd.github.v3+json'
-        }
-        
         # Get repos from the last week
-        query = f"stars:>50 created:>{_get_date_filter('weekly')}"
-        url = f"https://api.github.com/search/repositories?q={query}&sort=stars&order=desc&per_page={limit}"
-        
-        response = requests.get(url, headers=headers)
-        
-        if response.status_code == 200:
-            data = response.json()
-            developers = []
-            
-            for repo in data.get('items', []):
-                developers.append({
-                    "title": f"{repo['owner']['login']} created {repo['name']}",
-                    "url": repo['owner']['html_url'],
-                    "score": repo['stargazers_count'],
-                    "source": "github",
-                    "developer": repo['owner']['login'],
-                    "repo_name": repo['name'],
-                    "stars": repo['stargazers_count']
-                })
-            
-            return developers
-        else:
-            print(f"Error fetching GitHub developers: HTTP {response.status_code}")
+        data = github.search_repositories(_developers_query(), per_page=limit)
+        return _parse_developers(data)
+
+    except Exception as e:
+        print(f"Error fetching GitHub developers: {e}")
+        return []
+
+@memoize(MEMO_TTL, limit_arg='limit', name='fetch_github_trending')
+async def afetch_github_trending(language="", period="daily", limit=5, client=None):
+    """Async version of fetch_github_trending"""
+    try:
+        data = await github.asearch_repositories(_trending_query(language, period), per_page=limit, client=client)
+        return _parse_trending(data)
+
+    except Exception as e:
+        print(f"Error fetching GitHub trending: {e}")
+        return []
+
+@memoize(MEMO_TTL, limit_arg='limit', name='fetch_github_topics')
+async def afetch_github_topics(topics=None, limit=3, client=None):
+    """Async version of fetch_github_topics; topics are fetched concurrently"""
+    if topics is None:
+        topics = DEFAULT_TOPICS
+
+    async def fetch_topic(http, topic):
+        try:
+            data = await github.asearch_repositories(f"topic:{topic}", per_page=2, client=http)
+            return _parse_topic(data, topic)
+
+        except Exception as e:
+            print(f"Error fetching GitHub topic {topic}: {e}")
             return []
-            
+
+    async with async_client_scope(client) as http:
+        results = await asyncio.gather(*(fetch_topic(http, topic) for topic in _plan_topics(topics)))
+
+    all_repos = [repo for repos in results for repo in repos]
+    return _top_by_stars(all_repos, limit)
+
+@memoize(MEMO_TTL, limit_arg='limit', name='fetch_github_developers')
+async def afetch_github_developers(limit=5, client=None):
+    """Async version of fetch_github_developers"""
+    try:
+        data = await github.asearch_repositories(_developers_query(), per_page=limit, client=client)
+        return _parse_developers(data)
+
     except Exception as e:
         print(f"Error fetching GitHub developers: {e}")
-        return []
\ No newline at end of file
+        return []
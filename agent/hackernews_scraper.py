@@ -1,148 +1,502 @@
-import requests
+import asyncio
 import json
+import os
+import threading
 import time
+import re
+import html
+from concurrent.futures import ThreadPoolExecutor, wait
 from dotenv import load_dotenv
+from agent.http_client import http_get, async_client_scope
+from agent.cache_manager import cache, memoize
 
 load_dotenv()
 
-def fetch_hackernews_top(limit=10):
-    """Fetch top stories from Hacker News"""
+# Seconds results are memoized per distinct arguments
+MEMO_TTL = 240
+
+HN_API_URL = "https://hacker-news.firebaseio.com/v0"
+HN_ALGOLIA_URL = os.getenv("HN_ALGOLIA_URL", "https://hn.algolia.com/api/v1")
+
+# "firebase" fetches one item per story; "algolia" fetches whole pages of stories per request
+HN_BACKEND = os.getenv("HN_BACKEND", "firebase")
+
+# Algolia endpoint and filters for each Firebase story list
+ALGOLIA_LISTS = {
+    "topstories": ("search", {"tags": "front_page"}),
+    "beststories": ("search", {"tags": "story"}),
+    "newstories": ("search_by_date", {"tags": "story"})
+}
+
+# Algolia caps hitsPerPage at 1000
+ALGOLIA_MAX_PAGE_SIZE = 1000
+
+# "best" on Algolia means the most popular stories of the last week
+ALGOLIA_BEST_WINDOW = 7 * 24 * 3600
+
+def _parse_story(story_id, story_data):
+    """Convert a Hacker News item into a story dict, or None if it isn't a story"""
+    if story_data and story_data.get('type') == 'story':
+        return {
+            "id": story_id,
+            "title": story_data.get('title', ''),
+            "url": story_data.get('url', f"https://news.ycombinator.com/item?id={story_id}"),
+            "score": story_data.get('score', 0),
+            "source": "hackernews",
+            "comments": story_data.get('descendants', 0),
+            "author": story_data.get('by', ''),
+            "time": story_data.get('time', 0)
+        }
+    return None
+
+def _fetch_item(item_id):
+    """Fetch a single Hacker News item, returning None on failure"""
     try:
-        # Get top story IDs
-        top_stories_url = "https://hacker-news.firebaseio.com/v0/topstories.json"
-        response = requests.get(top_stories_url)
-        
+        response = http_get(f"{HN_API_URL}/item/{item_id}.json")
         if response.status_code == 200:
-            story_ids = response.json()[:limit]
-            stories = []
-            
-            for story_id in story_ids:
-                story_url = f"https://hacker-news.firebaseio.com/v0/item/{story_id}.json"
-                story_response = requests.get(story_url)
-                
-                if story_response.status_code == 200:
-                    story_data = story_response.json()
-                    if story_data and story_data.get('type') == 'story':
-                        stories.append({
-                            "title": story_data.get('title', ''),
-                            "url": story_data.get('url', f"https://news.ycombinator.com/item?id={story_id}"),
-                            "score": story_data.get('score', 0),
-                            "source": "hackernews",
-                            "comments": story_data.get('descendants', 0),
-                            "author": story_data.get('by', ''),
-                            "time": story_data.get('time', 0)
-                        })
-                
-                time.sleep(0.1)  # Rate limiting
-            
+            return response.json()
+        print(f"Error fetching Hacker News item {item_id}: HTTP {response.status_code}")
+    except Exception as e:
+        print(f"Error fetching Hacker News item {item_id}: {e}")
+    return None
+
+class HackerNewsItemStore:
+    """
+    Shared store of Hacker News items
+
+    Each id is downloaded at most once per TTL, no matter how many story
+    lists ask for it; missing ids are fetched concurrently.
+    """
+
+    def __init__(self, ttl=300, max_concurrency=10):
+        """
+        Initialize item store
+
+        Args:
+            ttl: Seconds a fetched item is reused before it is downloaded again
+            max_concurrency: Maximum item requests in flight at once
+        """
+        self.ttl = ttl
+        self.max_concurrency = max_concurrency
+        self._items = {}  # item id -> (fetched_at, item data)
+        self._lock = threading.Lock()
+
+    def _missing(self, item_ids):
+        """Unique ids that aren't stored or whose TTL has passed, in request order"""
+        now = time.time()
+        with self._lock:
+            return [item_id for item_id in dict.fromkeys(item_ids)
+                    if item_id not in self._items or now - self._items[item_id][0] > self.ttl]
+
+    def _store(self, item_id, item_data):
+        if item_data is not None:
+            with self._lock:
+                self._items[item_id] = (time.time(), item_data)
+
+    def _collect(self, item_ids):
+        """Map each requested id to its stored item (None if it couldn't be fetched)"""
+        with self._lock:
+            return {item_id: self._items[item_id][1] if item_id in self._items else None
+                    for item_id in item_ids}
+
+    def get_items(self, item_ids):
+        """
+        Get items by id, fetching any that aren't already stored
+
+        Args:
+            item_ids: Hacker News item ids (duplicates are fetched once)
+
+        Returns:
+            Dict of item id -> item data (None for items that failed)
+        """
+        missing = self._missing(item_ids)
+
+        if missing:
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(missing))) as executor:
+                for item_id, item_data in zip(missing, executor.map(_fetch_item, missing)):
+                    self._store(item_id, item_data)
+
+        return self._collect(item_ids)
+
+    async def aget_items(self, item_ids, client=None):
+        """Async version of get_items using a shared httpx client"""
+        missing = self._missing(item_ids)
+
+        if missing:
+            semaphore = asyncio.Semaphore(self.max_concurrency)
+
+            async with async_client_scope(client) as http:
+                async def fetch_item(item_id):
+                    try:
+                        async with semaphore:
+                            response = await http.get(f"{HN_API_URL}/item/{item_id}.json")
+                        if response.status_code == 200:
+                            self._store(item_id, response.json())
+                        else:
+                            print(f"Error fetching Hacker News item {item_id}: HTTP {response.status_code}")
+                    except Exception as e:
+                        print(f"Error fetching Hacker News item {item_id}: {e}")
+
+                await asyncio.gather(*(fetch_item(item_id) for item_id in missing))
+
+        return self._collect(item_ids)
+
+    def clear(self):
+        """Drop all stored items"""
+        with self._lock:
+            self._items.clear()
+
+# Shared item store instance
+item_store = HackerNewsItemStore()
+
+def _fetch_story_ids(list_name, limit):
+    """Fetch the first `limit` ids of a Hacker News story list (topstories, beststories, ...)"""
+    response = http_get(f"{HN_API_URL}/{list_name}.json")
+
+    if response.status_code != 200:
+        raise Exception(f"HTTP {response.status_code}")
+
+    return response.json()[:limit]
+
+async def _afetch_story_ids(list_name, limit, http):
+    """Async version of _fetch_story_ids"""
+    response = await http.get(f"{HN_API_URL}/{list_name}.json")
+
+    if response.status_code != 200:
+        raise Exception(f"HTTP {response.status_code}")
+
+    return response.json()[:limit]
+
+def _stories_from_items(story_ids, items):
+    """Build story dicts for the given ids, in order, from fetched items"""
+    stories = []
+    for story_id in story_ids:
+        story = _parse_story(story_id, items.get(story_id))
+        if story:
+            stories.append(story)
+    return stories
+
+def _parse_algolia_hit(hit):
+    """Convert an Algolia search hit into the same story dict the Firebase path produces"""
+    story_id = hit.get('objectID')
+    return {
+        "id": int(story_id) if story_id and story_id.isdigit() else story_id,
+        "title": hit.get('title') or '',
+        "url": hit.get('url') or f"https://news.ycombinator.com/item?id={story_id}",
+        "score": hit.get('points') or 0,
+        "source": "hackernews",
+        "comments": hit.get('num_comments') or 0,
+        "author": hit.get('author') or '',
+        "time": hit.get('created_at_i') or 0
+    }
+
+def _algolia_request(list_name, limit, page):
+    """Build the Algolia URL and query parameters for one page of a story list"""
+    endpoint, params = ALGOLIA_LISTS[list_name]
+    params = dict(params, hitsPerPage=min(limit, ALGOLIA_MAX_PAGE_SIZE), page=page)
+
+    if list_name == "beststories":
+        params["numericFilters"] = f"created_at_i>{int(time.time()) - ALGOLIA_BEST_WINDOW}"
+
+    return f"{HN_ALGOLIA_URL}/{endpoint}", params
+
+def _collect_algolia_page(data, stories, limit):
+    """Add a page of hits to stories; returns True if more pages should be fetched"""
+    for hit in data.get('hits', []):
+        if len(stories) < limit and hit.get('title'):
+            stories.append(_parse_algolia_hit(hit))
+
+    return len(stories) < limit and data.get('page', 0) + 1 < data.get('nbPages', 0)
+
+def _fetch_algolia_stories(list_name, limit):
+    """Fetch the first `limit` stories of a story list from Algolia, one request per page"""
+    stories = []
+    page = 0
+
+    while True:
+        url, params = _algolia_request(list_name, limit, page)
+        response = http_get(url, params=params)
+
+        if response.status_code != 200:
+            raise Exception(f"HTTP {response.status_code}")
+
+        if not _collect_algolia_page(response.json(), stories, limit):
             return stories
-        else:
-            print(f"Error fetching Hacker News top stories: HTTP {response.status_code}")
-            return []
-            
+        page += 1
+
+async def _afetch_algolia_stories(list_name, limit, http):
+    """Async version of _fetch_algolia_stories"""
+    stories = []
+    page = 0
+
+    while True:
+        url, params = _algolia_request(list_name, limit, page)
+        response = await http.get(url, params=params)
+
+        if response.status_code != 200:
+            raise Exception(f"HTTP {response.status_code}")
+
+        if not _collect_algolia_page(response.json(), stories, limit):
+            return stories
+        page += 1
+
+def _use_algolia(backend):
+    """Resolve the backend argument (None means the configured HN_BACKEND)"""
+    backend = backend or HN_BACKEND
+    if backend not in ("firebase", "algolia"):
+        raise ValueError(f"Unknown Hacker News backend: {backend}")
+    return backend == "algolia"
+
+def _fetch_stories(list_name, limit, backend=None):
+    """Fetch the first `limit` stories of a Hacker News story list"""
+    if _use_algolia(backend):
+        return _fetch_algolia_stories(list_name, limit)
+
+    story_ids = _fetch_story_ids(list_name, limit)
+    return _stories_from_items(story_ids, item_store.get_items(story_ids))
+
+async def _afetch_stories(list_name, limit, client=None, backend=None):
+    """Async version of _fetch_stories"""
+    async with async_client_scope(client) as http:
+        if _use_algolia(backend):
+            return await _afetch_algolia_stories(list_name, limit, http)
+
+        story_ids = await _afetch_story_ids(list_name, limit, http)
+        items = await item_store.aget_items(story_ids, http)
+
+    return _stories_from_items(story_ids, items)
+
+def _select_trending(stories, limit):
+    """Deduplicate stories by title and rank by a combination of score and comments"""
+    all_stories = []
+    seen_titles = set()
+
+    for story in stories:
+        if story['title'] not in seen_titles:
+            seen_titles.add(story['title'])
+            all_stories.append(story)
+
+    # Sort by a combination of score and comments for "trending"
+    all_stories.sort(key=lambda x: (x['score'] + x['comments'] * 2), reverse=True)
+
+    return all_stories[:limit]
+
+@memoize(MEMO_TTL, limit_arg='limit')
+def fetch_hackernews_top(limit=10, backend=None):
+    """Fetch top stories from Hacker News"""
+    try:
+        return _fetch_stories("topstories", limit, backend)
     except Exception as e:
-        print(f"Error fetching Hacker News stories: {e}")
+        print(f"Error fetching Hacker News top stories: {e}")
         return []
 
-def fetch_hackernews_best(limit=10):
+@memoize(MEMO_TTL, limit_arg='limit')
+def fetch_hackernews_best(limit=10, backend=None):
     """Fetch best stories from Hacker News"""
     try:
-        # Get best story IDs
-        best_stories_url = "https://hacker-news.firebaseio.com/v0/beststories.json"
-        response = requests.get(best_stories_url)
-        
-        if response.status_code == 200:
-            story_ids = response.json()[:limit]
-            stories = []
-            
-            for story_id in story_ids:
-                story_url = f"https://hacker-news.firebaseio.com/v0/item/{story_id}.json"
-                story_response = requests.get(story_url)
-                
-                if story_response.status_code == 200:
-                    story_data = story_response.json()
-                    if story_data and story_data.get('type') == 'story':
-                        stories.append({
-                            "title": story_data.get('title', ''),
-                            "url": story_data.get('url', f"https://news.ycombinator.com/item?id={story_id}"),
-                            "score": story_data.get('score', 0),
-                            "source": "hackernews",
-                            "comments": story_data.get('descendants', 0),
-                            "author": story_data.get('by', ''),
-                            "time": story_data.get('time', 0)
-                        })
-                
-                time.sleep(0.1)  # Rate limiting
-            
-            return stories
-        else:
-            print(f"Error fetching Hacker News best stories: HTTP {response.status_code}")
-            return []
-            
+        return _fetch_stories("beststories", limit, backend)
     except Exception as e:
         print(f"Error fetching Hacker News best stories: {e}")
         return []
 
-def fetch_hackernews_new(limit=10):
+@memoize(MEMO_TTL, limit_arg='limit')
+def fetch_hackernews_new(limit=10, backend=None):
     """Fetch new stories from Hacker News"""
     try:
-        # Get new story IDs
-        new_stories_url = "https://hacker-news.firebaseio.com/v0/newstories.json"
-        response = requests.get(new_stories_url)
-        
-        if response.status_code == 200:
-            story_ids = response.json()[:limit]
-            stories = []
-            
-            for story_id in story_ids:
-                story_url = f"https://hacker-news.firebaseio.com/v0/item/{story_id}.json"
-                story_response = requests.get(story_url)
-                
-                if story_response.status_code == 200:
-                    story_data = story_response.json()
-                    if story_data and story_data.get('type') == 'story':
-                        stories.append({
-                            "title": story_data.get('title', ''),
-                            "url": story_data.get('url', f"https://news.ycombinator.com/item?id={story_id}"),
-                            "score": story_data.get('score', 0),
-                            "source": "hackernews",
-                            "comments": story_data.get('descendants', 0),
-                            "author": story_data.get('by', ''),
-                            "time": story_data.get('time', 0)
-                        })
-                
-                time.sleep(0.1)  # Rate limiting
-            
-            return stories
-        else:
-            print(f"Error fetching Hacker News new stories: HTTP {response.status_code}")
-            return []
-            
+        return _fetch_stories("newstories", limit, backend)
     except Exception as e:
         print(f"Error fetching Hacker News new stories: {e}")
         return []
 
-def fetch_hackernews_trending(limit=5):
+@memoize(MEMO_TTL, limit_arg='limit')
+def fetch_hackernews_trending(limit=5, backend=None):
     """Fetch trending stories (combination of top and best with high engagement)"""
     try:
-        # Get both top and best stories
-        top_stories = fetch_hackernews_top(20)
-        best_stories = fetch_hackernews_best(20)
-        
-        # Combine and deduplicate
-        all_stories = []
-        seen_titles = set()
-        
-        for story in top_stories + best_stories:
-            if story['title'] not in seen_titles:
-                seen_titles.add(story['title'])
-                all_stories.append(story)
-        
-        # Sort by a combination of score and comments for "trending"
-        all_stories.sort(key=lambda x: (x['score'] + x['comments'] * 2), reverse=True)
-        
-        return all_stories[:limit]
-        
+        if _use_algolia(backend):
+            stories = _fetch_algolia_stories("topstories", 20) + _fetch_algolia_stories("beststories", 20)
+            return _select_trending(stories, limit)
+
+        # Get both top and best story ids, then fetch the union of items once
+        story_ids = _fetch_story_ids("topstories", 20) + _fetch_story_ids("beststories", 20)
+        stories = _stories_from_items(story_ids, item_store.get_items(story_ids))
+
+        return _select_trending(stories, limit)
+
     except Exception as e:
         print(f"Error fetching Hacker News trending: {e}")
-        return []
\ No newline at end of file
+        return []
+
+@memoize(MEMO_TTL, limit_arg='limit', name='fetch_hackernews_top')
+async def afetch_hackernews_top(limit=10, client=None, backend=None):
+    """Async version of fetch_hackernews_top"""
+    try:
+        return await _afetch_stories("topstories", limit, client, backend)
+    except Exception as e:
+        print(f"Error fetching Hacker News top stories: {e}")
+        return []
+
+@memoize(MEMO_TTL, limit_arg='limit', name='fetch_hackernews_best')
+async def afetch_hackernews_best(limit=10, client=None, backend=None):
+    """Async version of fetch_hackernews_best"""
+    try:
+        return await _afetch_stories("beststories", limit, client, backend)
+    except Exception as e:
+        print(f"Error fetching Hacker News best stories: {e}")
+        return []
+
+@memoize(MEMO_TTL, limit_arg='limit', name='fetch_hackernews_new')
+async def afetch_hackernews_new(limit=10, client=None, backend=None):
+    """Async version of fetch_hackernews_new"""
+    try:
+        return await _afetch_stories("newstories", limit, client, backend)
+    except Exception as e:
+        print(f"Error fetching Hacker News new stories: {e}")
+        return []
+
+@memoize(MEMO_TTL, limit_arg='limit', name='fetch_hackernews_trending')
+async def afetch_hackernews_trending(limit=5, client=None, backend=None):
+    """Async version of fetch_hackernews_trending; top and best lists are fetched concurrently"""
+    try:
+        async with async_client_scope(client) as http:
+            if _use_algolia(backend):
+                top_stories, best_stories = await asyncio.gather(
+                    _afetch_algolia_stories("topstories", 20, http),
+                    _afetch_algolia_stories("beststories", 20, http)
+                )
+                return _select_trending(top_stories + best_stories, limit)
+
+            top_ids, best_ids = await asyncio.gather(
+                _afetch_story_ids("topstories", 20, http),
+                _afetch_story_ids("beststories", 20, http)
+            )
+            story_ids = top_ids + best_ids
+            items = await item_store.aget_items(story_ids, http)
+
+        return _select_trending(_stories_from_items(story_ids, items), limit)
+
+    except Exception as e:
+        print(f"Error fetching Hacker News trending: {e}")
+        return []
+
+def _comment_text(node, max_chars):
+    """Plain-text excerpt of a comment's HTML body"""
+    text = html.unescape(re.sub(r"<[^>]+>", " ", node.get('text') or ''))
+    text = " ".join(text.split())
+    return text if len(text) <= max_chars else text[:max_chars].rstrip() + "..."
+
+def _comment_score(node, depth, rank):
+    """
+    Rank comments for excerpting
+
+    The API exposes no comment scores, but kids are returned in the site's
+    ranked order, so shallow, early comments with many replies score highest.
+    """
+    return (len(node.get('kids', [])) + 1) / ((depth + 1) * (rank + 1))
+
+def fetch_comment_excerpts(story_id, kids=None, max_depth=2, max_fanout=5, max_nodes=40,
+                           deadline=3.0, top_n=3, max_chars=200, cache_ttl=6 * 3600):
+    """
+    Walk a story's comment tree breadth-first and return its top comment excerpts
+
+    Each level is fetched concurrently. The walk stops at max_depth, follows
+    at most max_fanout kids per node, fetches at most max_nodes comments and
+    abandons any requests still pending when the deadline passes. Fetched
+    comments are cached across runs.
+
+    Args:
+        story_id: Hacker News story id
+        kids: The story's kid ids, if already known (saves one request)
+        max_depth: Deepest comment level to visit (1 = top-level comments only)
+        max_fanout: Maximum kids followed per node
+        max_nodes: Maximum comments visited in total
+        deadline: Wall-clock budget in seconds
+        top_n: Number of excerpts to return
+        max_chars: Maximum characters per excerpt
+        cache_ttl: Seconds fetched comments are kept in the cache
+
+    Returns:
+        List of excerpt strings, best first
+    """
+    started = time.monotonic()
+    cache_key = f"hn_comments:{story_id}"
+    nodes = dict(cache.get(cache_key) or {})  # str(comment id) -> comment item
+    fetched_count = 0
+
+    if kids is None:
+        story = _fetch_item(story_id)
+        kids = story.get('kids', []) if story else []
+
+    scored = []
+    visited = 0
+    level = [(kid, rank) for rank, kid in enumerate(kids[:max_fanout])]
+
+    # Not a context manager: exiting one would wait for abandoned requests
+    executor = ThreadPoolExecutor(max_workers=max_fanout)
+    try:
+        for depth in range(max_depth):
+            level = level[:max_nodes - visited]
+            if not level:
+                break
+
+            remaining = deadline - (time.monotonic() - started)
+            if remaining <= 0:
+                break
+
+            missing = [comment_id for comment_id, _ in level if str(comment_id) not in nodes]
+            futures = {executor.submit(_fetch_item, comment_id): comment_id for comment_id in missing}
+            done, not_done = wait(futures, timeout=remaining)
+            for future in not_done:
+                future.cancel()
+            for future in done:
+                node = future.result()
+                if node:
+                    nodes[str(futures[future])] = node
+                    fetched_count += 1
+
+            next_level = []
+            for comment_id, rank in level:
+                node = nodes.get(str(comment_id))
+                visited += 1
+                if not node or node.get('deleted') or node.get('dead'):
+                    continue
+                scored.append((_comment_score(node, depth, rank), node))
+                next_level.extend((kid, kid_rank) for kid_rank, kid in enumerate(node.get('kids', [])[:max_fanout]))
+            level = next_level
+
+            if not_done:
+                print(f"Comment traversal for story {story_id} hit its {deadline}s deadline")
+                break
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    if fetched_count:
+        cache.set(cache_key, nodes, cache_ttl)
+
+    scored.sort(key=lambda x: x[0], reverse=True)
+    excerpts = [_comment_text(node, max_chars) for _, node in scored]
+    return [excerpt for excerpt in excerpts if excerpt][:top_n]
+
+def enrich_hackernews_items(items, **traversal_options):
+    """
+    Attach top comment excerpts to Hacker News items as `comment_excerpts`
+
+    Items may be the cached objects themselves, so enriched items are
+    copies and the given items are left unchanged.
+
+    Args:
+        items: Content items; only those with source "hackernews" and an id are enriched
+        **traversal_options: Passed to fetch_comment_excerpts
+
+    Returns:
+        New list of items, with enriched copies in place of the enriched ones
+    """
+    enriched = []
+    for item in items:
+        if item.get('source') == 'hackernews' and item.get('id') and item.get('comments'):
+            try:
+                item = dict(item, comment_excerpts=fetch_comment_excerpts(item['id'], **traversal_options))
+            except Exception as e:
+                print(f"Error fetching comments for Hacker News story {item['id']}: {e}")
+        enriched.append(item)
+
+    return enriched
@@ -0,0 +1,192 @@
+import threading
+import httpx
+import requests
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse, urlencode
+from requests.adapters import HTTPAdapter
+from agent.cache_manager import cached_request, acached_request, Validated, NOT_MODIFIED
+
+try:
+    import brotli  # noqa: F401 - enables "br" decoding in urllib3 and httpx
+    ACCEPT_ENCODING = 'gzip, deflate, br'
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'jdx-pulse/1.0 (https://jdxsoftware.com)',
+    'Accept-Encoding': ACCEPT_ENCODING
+}
+
+# Extra headers sent to specific hosts
+HOST_HEADERS = {
+    'api.github.com': {
+        'Accept': 'application/vnd.github.v3+json'
+    }
+}
+
+# (connect, read) timeouts in seconds
+DEFAULT_TIMEOUT = (5, 15)
+
+# Number of per-host pools kept, and connections kept alive per host
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 20
+
+def host_headers(url, headers=None):
+    """Build the headers for a request: per-host defaults overridden by explicit headers"""
+    merged = dict(HOST_HEADERS.get(urlparse(url).hostname, {}))
+    if headers:
+        merged.update(headers)
+    return merged
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that applies a default timeout when the caller doesn't pass one"""
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super().send(request, **kwargs)
+
+_session = None
+_session_lock = threading.Lock()
+
+def create_session(timeout=DEFAULT_TIMEOUT, pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE):
+    """
+    Create a requests session with keep-alive connection pools per host
+
+    Args:
+        timeout: Default (connect, read) timeout in seconds
+        pool_connections: Number of host pools to keep
+        pool_maxsize: Maximum connections kept per host
+
+    Returns:
+        requests.Session
+    """
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+
+    adapter = TimeoutHTTPAdapter(timeout=timeout, pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+
+    return session
+
+def get_session():
+    """Get the process-wide shared session, creating it on first use"""
+    global _session
+
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = create_session()
+
+    return _session
+
+def http_get(url, headers=None, **kwargs):
+    """
+    GET a URL through the shared session
+
+    Args:
+        url: URL to fetch
+        headers: Extra headers, overriding the defaults for the URL's host
+        **kwargs: Passed through to requests (params, timeout, ...)
+
+    Returns:
+        requests.Response
+    """
+    return get_session().get(url, headers=host_headers(url, headers), **kwargs)
+
+def conditional_headers(validators):
+    """Build If-None-Match / If-Modified-Since headers from stored validators"""
+    headers = {}
+    if validators.get('etag'):
+        headers['If-None-Match'] = validators['etag']
+    if validators.get('last_modified'):
+        headers['If-Modified-Since'] = validators['last_modified']
+    return headers
+
+def _validated_json(response):
+    """Turn a response into Validated JSON, NOT_MODIFIED for a 304, or raise on errors"""
+    if response.status_code == 304:
+        return NOT_MODIFIED
+    if response.status_code != 200:
+        raise Exception(f"HTTP {response.status_code}")
+    return Validated(response.json(), response.headers.get('ETag'), response.headers.get('Last-Modified'))
+
+def _json_cache_key(url, params):
+    return f"http:{url}?{urlencode(params)}" if params else f"http:{url}"
+
+def cached_get_json(url, params=None, headers=None, ttl=60):
+    """
+    GET a JSON document, cached together with its ETag / Last-Modified
+
+    Once the entry expires it is revalidated with a conditional request; a
+    304 reuses the stored document and just extends its TTL.
+
+    Args:
+        url: URL to fetch
+        params: Query parameters
+        headers: Extra request headers
+        ttl: Seconds the document is used without revalidating
+
+    Returns:
+        Parsed JSON, or None if the request failed
+    """
+    def fetch():
+        return _validated_json(http_get(url, params=params, headers=headers))
+
+    def revalidate(validators):
+        return _validated_json(http_get(url, params=params, headers=dict(headers or {}, **conditional_headers(validators))))
+
+    return cached_request(_json_cache_key(url, params), fetch, ttl, revalidate, default_factory=lambda: None)
+
+async def acached_get_json(url, params=None, headers=None, ttl=60, client=None):
+    """Async version of cached_get_json"""
+    async with async_client_scope(client) as http:
+        async def fetch():
+            return _validated_json(await http.get(url, params=params, headers=headers))
+
+        async def revalidate(validators):
+            return _validated_json(await http.get(url, params=params, headers=dict(headers or {}, **conditional_headers(validators))))
+
+        return await acached_request(_json_cache_key(url, params), fetch, ttl, revalidate, default_factory=lambda: None)
+
+async def _apply_host_headers(request):
+    """httpx request hook adding per-host headers the caller didn't set"""
+    for name, value in HOST_HEADERS.get(request.url.host, {}).items():
+        request.headers.setdefault(name, value)
+
+def create_async_client(max_connections=100, max_keepalive=20, timeout=DEFAULT_TIMEOUT):
+    """
+    Create an async HTTP client to share between scrapers
+
+    Args:
+        max_connections: Maximum concurrent connections across all hosts
+        max_keepalive: Maximum idle connections kept open for reuse
+        timeout: Default (connect, read) timeout in seconds
+
+    Returns:
+        httpx.AsyncClient (close it with `async with` or `aclose()`)
+    """
+    connect_timeout, read_timeout = timeout
+
+    return httpx.AsyncClient(
+        headers=DEFAULT_HEADERS,
+        timeout=httpx.Timeout(read_timeout, connect=connect_timeout),
+        limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive),
+        event_hooks={'request': [_apply_host_headers]},
+        follow_redirects=True
+    )
+
+@asynccontextmanager
+async def async_client_scope(client=None):
+    """Yield the given client, or a temporary one that is closed on exit"""
+    if client is not None:
+        yield client
+        return
+
+    async with create_async_client() as owned_client:
+        yield owned_client
@@ -0,0 +1,273 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+class LatencyTracker:
+    """Rolling window of request latencies"""
+    
+    def __init__(self, window=50, min_samples=5, samples=()):
+        """
+        Initialize tracker
+        
+        Args:
+            window: Number of most recent latencies kept
+            min_samples: Samples needed before percentile() returns a value
+            samples: Earlier latencies to start from, oldest first
+        """
+        self.min_samples = min_samples
+        self._samples = deque(samples, maxlen=window)
+    
+    def record(self, seconds):
+        """Record one request latency"""
+        self._samples.append(seconds)
+    
+    def percentile(self, percent):
+        """Latency below which `percent` of recent requests finished, or None with too few samples"""
+        if len(self._samples) < self.min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+    
+    def clear(self):
+        self._samples.clear()
+
+class LatencyStore:
+    """
+    Persistent request latencies and demotions per model
+    
+    A batched run sends only a few requests per model, so latencies are
+    kept across runs for the router's percentiles to have enough samples.
+    Lives in the summary cache's SQLite database; each thread uses its own
+    connection.
+    """
+    
+    def __init__(self, path=os.path.join("cache", "summaries.sqlite3"), max_samples=100):
+        """
+        Initialize latency store
+        
+        Args:
+            path: SQLite database file
+            max_samples: Latencies kept per model
+        """
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        
+        self.path = path
+        self.max_samples = max_samples
+        self._local = threading.local()
+        
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS model_latencies ("
+                " model TEXT NOT NULL,"
+                " seconds REAL NOT NULL,"
+                " recorded_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_model_latencies_model ON model_latencies (model, recorded_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS model_demotions (model TEXT PRIMARY KEY, until REAL NOT NULL)")
+    
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn = conn
+        return conn
+    
+    def load(self, limit):
+        """
+        Read everything back
+        
+        Returns:
+            (dict of model -> up to `limit` most recent latencies, oldest first,
+             dict of model -> time its demotion ends)
+        """
+        conn = self._connection()
+        latencies = {}
+        for model, seconds in conn.execute("SELECT model, seconds FROM model_latencies ORDER BY recorded_at DESC"):
+            samples = latencies.setdefault(model, [])
+            if len(samples) < limit:
+                samples.append(seconds)
+        
+        demotions = dict(conn.execute("SELECT model, until FROM model_demotions WHERE until > ?", (time.time(),)))
+        return {model: samples[::-1] for model, samples in latencies.items()}, demotions
+    
+    def record(self, model, seconds):
+        """Store one latency, keeping the most recent max_samples per model"""
+        conn = self._connection()
+        with conn:
+            conn.execute("INSERT INTO model_latencies (model, seconds, recorded_at) VALUES (?, ?, ?)",
+                         (model, seconds, time.time()))
+            conn.execute(
+                "DELETE FROM model_latencies WHERE model = ? AND rowid NOT IN"
+                " (SELECT rowid FROM model_latencies WHERE model = ? ORDER BY recorded_at DESC LIMIT ?)",
+                (model, model, self.max_samples)
+            )
+    
+    def demote(self, model, until):
+        """Record a demotion and forget the model's latencies, so it is judged afresh afterwards"""
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM model_latencies WHERE model = ?", (model,))
+            conn.execute("INSERT OR REPLACE INTO model_demotions (model, until) VALUES (?, ?)", (model, until))
+
+# Model tiers, cheapest and fastest first. Items go to the first tier whose
+# max_input_tokens fits them; cost is USD per 1K tokens (input and output blended)
+MODEL_TIERS = [
+    {'name': 'fast', 'model': os.getenv("SUMMARY_FAST_MODEL", "gpt-4o-mini"), 'max_input_tokens': 40,
+     'cost_per_1k': 0.0003},
+    {'name': 'quality', 'model': os.getenv("SUMMARY_MODEL", "gpt-4o"), 'max_input_tokens': None,
+     'cost_per_1k': 0.005}
+]
+
+# Sources pinned to a tier whatever their length: social topics are a few
+# words, Hacker News contexts can carry comment excerpts worth the larger model
+SOURCE_TIERS = {
+    'twitter': 'fast',
+    'tiktok': 'fast',
+    'hackernews': 'quality'
+}
+
+# Latency SLO: a model whose p90 request latency goes over this is demoted
+SUMMARY_LATENCY_SLO = float(os.getenv("SUMMARY_LATENCY_SLO", "10"))
+
+# Cost SLO: tiers dearer than this per 1K tokens are never used (0 means no limit)
+SUMMARY_MAX_COST_PER_1K = float(os.getenv("SUMMARY_MAX_COST_PER_1K", "0"))
+
+class ModelRouter:
+    """
+    Picks a summarization model per item and demotes models that breach the latency SLO
+    
+    Items are routed by source (SOURCE_TIERS) or else by input length to a
+    tier. While a tier's model is demoted, its items go to the nearest
+    cheaper tier that is still healthy (or the nearest dearer one if none
+    is). Demotion lasts for cooldown seconds, after which the model is
+    tried again with a fresh latency window. With a store, latencies and
+    demotions carry over between runs.
+    """
+    
+    def __init__(self, tiers=MODEL_TIERS, source_tiers=SOURCE_TIERS, latency_slo=SUMMARY_LATENCY_SLO,
+                 slo_percentile=90, max_cost_per_1k=SUMMARY_MAX_COST_PER_1K, cooldown=1800, window=20,
+                 min_samples=3, store=None):
+        """
+        Initialize router
+        
+        Args:
+            tiers: Model tiers, cheapest first
+            source_tiers: Dict of source -> tier name for sources routed regardless of length
+            latency_slo: Seconds the slo_percentile latency of a model may reach before it is demoted
+            slo_percentile: Latency percentile checked against latency_slo
+            max_cost_per_1k: Tiers costing more per 1K tokens are skipped (0 means no limit)
+            cooldown: Seconds a demoted model stays demoted
+            window: Latencies kept per model
+            min_samples: Latencies needed before a model's percentiles are used
+            store: LatencyStore persisting latencies and demotions (None keeps them in memory)
+        """
+        self.tiers = [tier for tier in tiers if not max_cost_per_1k or tier['cost_per_1k'] <= max_cost_per_1k]
+        if not self.tiers:
+            # A cost limit below every tier still leaves the cheapest one
+            self.tiers = [min(tiers, key=lambda tier: tier['cost_per_1k'])]
+        
+        self.source_tiers = source_tiers
+        self.latency_slo = latency_slo
+        self.slo_percentile = slo_percentile
+        self.cooldown = cooldown
+        self.window = window
+        self.min_samples = min_samples
+        self.store = store
+        self._latency = {}
+        self._totals = {}
+        self._demoted_until = {}
+        self._lock = threading.Lock()
+        
+        if store is not None:
+            try:
+                samples, self._demoted_until = store.load(window)
+                self._latency = {model: LatencyTracker(window, min_samples, seconds) for model, seconds in samples.items()}
+            except Exception as e:
+                print(f"Error loading model latencies: {e}")
+    
+    def tier_for(self, tokens, source=None):
+        """Index of the tier for an item of roughly `tokens` input tokens, before any demotion"""
+        names = [tier['name'] for tier in self.tiers]
+        if source in self.source_tiers and self.source_tiers[source] in names:
+            return names.index(self.source_tiers[source])
+        
+        for index, tier in enumerate(self.tiers):
+            if tier['max_input_tokens'] is None or tokens <= tier['max_input_tokens']:
+                return index
+        return len(self.tiers) - 1
+    
+    def is_demoted(self, model):
+        with self._lock:
+            return self._demoted_until.get(model, 0) > time.time()
+    
+    def resolve(self, tier):
+        """Model to send a tier's items to right now"""
+        candidates = list(range(tier, -1, -1)) + list(range(tier + 1, len(self.tiers)))
+        for index in candidates:
+            if not self.is_demoted(self.tiers[index]['model']):
+                return self.tiers[index]['model']
+        return self.tiers[tier]['model']
+    
+    def _tracker(self, model):
+        if model not in self._latency:
+            self._latency[model] = LatencyTracker(self.window, self.min_samples)
+        return self._latency[model]
+    
+    def percentile(self, model, percent):
+        """Recent latency percentile of a model, or None with too few samples"""
+        with self._lock:
+            return self._tracker(model).percentile(percent)
+    
+    def record(self, model, seconds, items=1):
+        """
+        Record a request's latency (a missed deadline counts at the deadline)
+        
+        Demotes the model if its latency percentile is now over the SLO.
+        """
+        with self._lock:
+            tracker = self._tracker(model)
+            tracker.record(seconds)
+            totals = self._totals.setdefault(model, {'requests': 0, 'items': 0, 'seconds': 0.0})
+            totals['requests'] += 1
+            totals['items'] += items
+            totals['seconds'] += seconds
+            
+            observed = tracker.percentile(self.slo_percentile)
+            demoted = observed is not None and observed > self.latency_slo
+            if demoted:
+                until = self._demoted_until[model] = time.time() + self.cooldown
+                tracker.clear()
+        
+        if demoted:
+            print(f"Demoting {model}: p{self.slo_percentile} latency {observed:.1f}s is over the {self.latency_slo}s SLO")
+        
+        if self.store is not None:
+            try:
+                if demoted:
+                    self.store.demote(model, until)
+                else:
+                    self.store.record(model, seconds)
+            except Exception as e:
+                print(f"Error storing latency for {model}: {e}")
+    
+    def info(self):
+        """Per-model requests, items and mean latency, recent p90 latency and whether the model is demoted"""
+        now = time.time()
+        with self._lock:
+            return {
+                model: dict(
+                    totals,
+                    mean_latency=totals['seconds'] / totals['requests'],
+                    p90_latency=self._latency[model].percentile(90),
+                    demoted=self._demoted_until.get(model, 0) > now
+                )
+                for model, totals in self._totals.items()
+            }
+
+# Global model router instance, keeping latencies across runs
+model_router = ModelRouter(store=LatencyStore())
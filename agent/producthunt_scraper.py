@@ -1,10 +1,16 @@
 import requests
 import json
 import time
+import asyncio
 from dotenv import load_dotenv
+from agent.cache_manager import memoize
 
 load_dotenv()
 
+# Seconds results are memoized per distinct arguments
+MEMO_TTL = 1200
+
+@memoize(MEMO_TTL, limit_arg='limit')
 def fetch_producthunt_today(limit=5):
     """Fetch today's top products from Product Hunt (placeholder implementation)"""
     try:
@@ -66,6 +72,7 @@ def fetch_producthunt_today(limit=5):
         print(f"Error fetching Product Hunt today: {e}")
         return []
 
+@memoize(MEMO_TTL, limit_arg='limit')
 def fetch_producthunt_trending(period="daily", limit=5):
     """Fetch trending products from Product Hunt"""
     try:
@@ -124,6 +131,7 @@ def fetch_producthunt_trending(period="daily", limit=5):
         print(f"Error fetching Product Hunt trending: {e}")
         return []
 
+@memoize(MEMO_TTL)
 def fetch_producthunt_categories(categories=None, limit_per_category=2):
     """Fetch products from specific categories"""
     if categories is None:
@@ -195,6 +203,7 @@ def fetch_producthunt_categories(categories=None, limit_per_category=2):
     all_products.sort(key=lambda x: x['votes'], reverse=True)
     return all_products[:limit_per_category * 2]
 
+@memoize(MEMO_TTL, limit_arg='limit')
 def fetch_producthunt_makers(limit=3):
     """Fetch trending makers/creators"""
     try:
@@ -232,4 +241,20 @@ def fetch_producthunt_makers(limit=3):
         
     except Exception as e:
         print(f"Error fetching Product Hunt makers: {e}")
-        return []
\ No newline at end of file
+        return []
+
+async def afetch_producthunt_today(limit=5):
+    """Async version of fetch_producthunt_today"""
+    return await asyncio.to_thread(fetch_producthunt_today, limit)
+
+async def afetch_producthunt_trending(period="daily", limit=5):
+    """Async version of fetch_producthunt_trending"""
+    return await asyncio.to_thread(fetch_producthunt_trending, period, limit)
+
+async def afetch_producthunt_categories(categories=None, limit_per_category=2):
+    """Async version of fetch_producthunt_categories"""
+    return await asyncio.to_thread(fetch_producthunt_categories, categories, limit_per_category)
+
+async def afetch_producthunt_makers(limit=3):
+    """Async version of fetch_producthunt_makers"""
+    return await asyncio.to_thread(fetch_producthunt_makers, limit)
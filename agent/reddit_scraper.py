@@ -1,57 +1,195 @@
 import os
-import requests
-import time
 from dotenv import load_dotenv
+from agent.http_client import http_get, cached_get_json, acached_get_json, async_client_scope
+from agent.cache_manager import memoize
 
 load_dotenv()
 
+# Seconds results are memoized per distinct arguments
+MEMO_TTL = 240
+
+DEFAULT_SUBREDDITS = ['technology', 'programming', 'startups', 'webdev', 'MachineLearning']
+
+# Reddit returns at most 100 posts per listing page
+REDDIT_PAGE_SIZE = 100
+
+def _parse_posts(data):
+    """Convert a Reddit listing payload into post dicts, skipping stickied posts"""
+    posts = []
+
+    for post_data in data['data']['children']:
+        post = post_data['data']
+        if not post.get('stickied', False):
+            posts.append({
+                "title": post['title'],
+                "url": f"https://reddit.com{post['permalink']}",
+                "score": post['score'],
+                "author": post['author'],
+                "subreddit": post['subreddit'],
+                "created_utc": post['created_utc']
+            })
+
+    return posts
+
+def _top_overall(all_posts, limit_per_sub):
+    """Sort by score and return top posts"""
+    all_posts.sort(key=lambda x: x['score'], reverse=True)
+    return all_posts[:limit_per_sub * 2]  # Return top posts overall
+
+@memoize(MEMO_TTL, limit_arg='limit')
 def fetch_top_posts(subreddit_name="technology", limit=5):
     """Fetch top posts from Reddit using read-only API without authentication"""
     try:
-        headers = {
-            'User-Agent': 'jdx-pulse/1.0 (https://jdxsoftware.com)'
-        }
-        
-        url = f"https://www.reddit.com/r/{subreddit_name}/hot.json?limit={limit}"
-        response = requests.get(url, headers=headers)
-        
-        if response.status_code == 200:
-            data = response.json()
-            posts = []
-            
-            for post_data in data['data']['children']:
-                post = post_data['data']
-                if not post.get('stickied', False):
-                    posts.append({
-                        "title": post['title'],
-                        "url": f"https://reddit.com{post['permalink']}",
-                        "score": post['score'],
-                        "author": post['author'],
-                        "subreddit": post['subreddit'],
-                        "created_utc": post['created_utc']
-                    })
-            
-            return posts
+        url = f"https://www.reddit.com/r/{subreddit_name}/hot.json"
+        data = cached_get_json(url, params={'limit': limit})
+
+        if data is not None:
+            return _parse_posts(data)
         else:
-            print(f"Error fetching Reddit posts: HTTP {response.status_code}")
+            print(f"Error fetching Reddit posts from r/{subreddit_name}")
             return []
-            
+
     except Exception as e:
         print(f"Error fetching Reddit posts: {e}")
         return []
 
+def _combined_listing_url(subreddits):
+    """URL of the combined hot listing for several subreddits (r/a+b+c)"""
+    return f"https://www.reddit.com/r/{'+'.join(subreddits)}/hot.json"
+
+def _listing_params(page_size, after):
+    params = {'limit': page_size}
+    if after:
+        params['after'] = after
+    return params
+
+def _listing_page(url, page_size, after):
+    """
+    GET one page of a listing
+
+    Only the first page is cached: `after` cursors change as the listing
+    moves, so deeper pages would each get a cache entry that is never read
+    again. The memoized fetchers cache the combined result instead.
+    """
+    if not after:
+        return cached_get_json(url, params=_listing_params(page_size, after))
+
+    response = http_get(url, params=_listing_params(page_size, after))
+    return response.json() if response.status_code == 200 else None
+
+async def _alisting_page(url, page_size, after, client):
+    """Async version of _listing_page"""
+    if not after:
+        return await acached_get_json(url, params=_listing_params(page_size, after), client=client)
+
+    response = await client.get(url, params=_listing_params(page_size, after))
+    return response.json() if response.status_code == 200 else None
+
+def _take_within_quota(data, quotas):
+    """Posts from a listing page whose subreddit still has quota left; updates quotas"""
+    posts = []
+    for post in _parse_posts(data):
+        subreddit = post['subreddit'].lower()
+        if quotas.get(subreddit, 0) > 0:
+            quotas[subreddit] -= 1
+            posts.append(post)
+    return posts
+
+def iter_subreddit_posts(subreddits=None, limit_per_sub=3, page_size=REDDIT_PAGE_SIZE, max_pages=3):
+    """
+    Stream hot posts from several subreddits using one combined listing
+
+    Pages are requested lazily with Reddit's `after` cursor, so callers can
+    stop early without loading deeper pages.
+
+    Args:
+        subreddits: Subreddit names (defaults to DEFAULT_SUBREDDITS)
+        limit_per_sub: Maximum posts yielded per subreddit
+        page_size: Posts requested per page (max 100)
+        max_pages: Maximum pages requested
+
+    Yields:
+        Post dicts, page by page, in listing order
+    """
+    if subreddits is None:
+        subreddits = DEFAULT_SUBREDDITS
+
+    quotas = {subreddit.lower(): limit_per_sub for subreddit in subreddits}
+    url = _combined_listing_url(subreddits)
+    after = None
+
+    for _ in range(max_pages):
+        data = _listing_page(url, page_size, after)
+
+        if data is None:
+            print("Error fetching Reddit posts from combined listing")
+            return
+
+        yield from _take_within_quota(data, quotas)
+
+        after = data['data'].get('after')
+        if not after or not any(quotas.values()):
+            return
+
+@memoize(MEMO_TTL)
 def fetch_multiple_subreddits(subreddits=None, limit_per_sub=3):
     """Fetch posts from multiple subreddits"""
+    try:
+        all_posts = list(iter_subreddit_posts(subreddits, limit_per_sub))
+    except Exception as e:
+        print(f"Error fetching Reddit posts: {e}")
+        return []
+
+    return _top_overall(all_posts, limit_per_sub)
+
+@memoize(MEMO_TTL, limit_arg='limit', name='fetch_top_posts')
+async def afetch_top_posts(subreddit_name="technology", limit=5, client=None):
+    """Async version of fetch_top_posts using a shared httpx client"""
+    try:
+        url = f"https://www.reddit.com/r/{subreddit_name}/hot.json"
+        data = await acached_get_json(url, params={'limit': limit}, client=client)
+
+        if data is not None:
+            return _parse_posts(data)
+        else:
+            print(f"Error fetching Reddit posts from r/{subreddit_name}")
+            return []
+
+    except Exception as e:
+        print(f"Error fetching Reddit posts: {e}")
+        return []
+
+async def aiter_subreddit_posts(subreddits=None, limit_per_sub=3, page_size=REDDIT_PAGE_SIZE, max_pages=3, client=None):
+    """Async version of iter_subreddit_posts"""
     if subreddits is None:
-        subreddits = ['technology', 'programming', 'startups', 'webdev', 'MachineLearning']
-    
-    all_posts = []
-    for subreddit in subreddits:
-        posts = fetch_top_posts(subreddit, limit_per_sub)
-        all_posts.extend(posts)
-        time.sleep(1)  # Rate limiting
-    
-    # Sort by score and return top posts
-    all_posts.sort(key=lambda x: x['score'], reverse=True)
-    return all_posts[:limit_per_sub * 2]  # Return top posts overall
+        subreddits = DEFAULT_SUBREDDITS
+
+    quotas = {subreddit.lower(): limit_per_sub for subreddit in subreddits}
+    url = _combined_listing_url(subreddits)
+    after = None
+
+    async with async_client_scope(client) as http:
+        for _ in range(max_pages):
+            data = await _alisting_page(url, page_size, after, http)
+
+            if data is None:
+                print("Error fetching Reddit posts from combined listing")
+                return
+
+            for post in _take_within_quota(data, quotas):
+                yield post
+
+            after = data['data'].get('after')
+            if not after or not any(quotas.values()):
+                return
+
+@memoize(MEMO_TTL, name='fetch_multiple_subreddits')
+async def afetch_multiple_subreddits(subreddits=None, limit_per_sub=3, client=None):
+    """Async version of fetch_multiple_subreddits"""
+    try:
+        all_posts = [post async for post in aiter_subreddit_posts(subreddits, limit_per_sub, client=client)]
+    except Exception as e:
+        print(f"Error fetching Reddit posts: {e}")
+        return []
 
+    return _top_overall(all_posts, limit_per_sub)
@@ -0,0 +1,148 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from agent.cache_manager import cache, refresh_entry
+
+class RefreshAheadScheduler:
+    """
+    Keeps cache entries warm by refreshing them before they expire
+    
+    Each registered key is refreshed once it reaches refresh_fraction of its
+    TTL. The refresh point is jittered per entry so keys cached together
+    don't all come due together, and at most max_concurrency refreshes run
+    at once.
+    """
+    
+    def __init__(self, refresh_fraction=0.8, jitter=0.1, max_concurrency=2, poll_interval=5):
+        """
+        Initialize scheduler
+        
+        Args:
+            refresh_fraction: Fraction of the TTL after which an entry is refreshed
+            jitter: Random spread of the refresh point, as a fraction of refresh_fraction (±)
+            max_concurrency: Maximum refreshes running at once
+            poll_interval: Seconds between checks for due entries
+        """
+        self.refresh_fraction = refresh_fraction
+        self.jitter = jitter
+        self.max_concurrency = max_concurrency
+        self.poll_interval = poll_interval
+        self._jobs = {}
+        self._running = set()
+        self._lock = threading.Lock()
+        self._executor = None
+        self._thread = None
+        self._stop = threading.Event()
+    
+    def register(self, key, fetch_function, ttl, revalidate_function=None, stale_ttl=0, ttl_policy=None,
+                 negative_cache=None):
+        """
+        Register a cache key to keep warm
+        
+        Args:
+            key: Cache key, as used with cached_request
+            fetch_function: Function that fetches the data
+            ttl: Time-to-live in seconds the entry is stored with
+            revalidate_function: Function taking the stored validators that sends a conditional request
+            stale_ttl: Stale-while-revalidate window the entry is stored with
+            ttl_policy: AdaptiveTTL the entry's TTL follows
+            negative_cache: NegativeCache for failed or empty refreshes
+        """
+        with self._lock:
+            self._jobs[key] = {
+                'fetch_function': fetch_function,
+                'ttl': ttl,
+                'revalidate_function': revalidate_function,
+                'stale_ttl': stale_ttl,
+                'ttl_policy': ttl_policy,
+                'negative_cache': negative_cache
+            }
+    
+    def due_at(self, key):
+        """Time at which a registered key should next be refreshed (0 if it isn't cached)"""
+        entry = cache.get_entry(key)
+        if entry is None:
+            return 0
+        
+        # Entries record the TTL they were stored with, which may have adapted
+        ttl = entry.get('ttl') or self._jobs[key]['ttl']
+        
+        # Seeded by the entry's expiry so the jitter is stable between polls but differs per entry
+        stored_at = entry['expires_at'] - ttl
+        spread = random.Random(f"{key}:{entry['expires_at']}").uniform(-self.jitter, self.jitter)
+        fraction = min(1.0, self.refresh_fraction * (1 + spread))
+        
+        return stored_at + ttl * fraction
+    
+    def run_pending(self):
+        """
+        Start refreshes for every registered key that is due
+        
+        Returns:
+            Number of refreshes started
+        """
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="refresh-ahead")
+        
+        now = time.time()
+        started = 0
+        
+        for key in list(self._jobs):
+            with self._lock:
+                if key in self._running:
+                    continue
+            
+            try:
+                if self.due_at(key) > now:
+                    continue
+            except Exception as e:
+                print(f"Error checking refresh time for key {key}: {e}")
+                continue
+            
+            with self._lock:
+                self._running.add(key)
+            self._executor.submit(self._refresh, key)
+            started += 1
+        
+        return started
+    
+    def _refresh(self, key):
+        job = self._jobs[key]
+        try:
+            print(f"Refreshing ahead of expiry: {key}")
+            refresh_entry(key, job['fetch_function'], job['ttl'], job['revalidate_function'], job['stale_ttl'],
+                          job['ttl_policy'], job['negative_cache'])
+        except Exception as e:
+            print(f"Error refreshing key {key} ahead of expiry: {e}")
+        finally:
+            with self._lock:
+                self._running.discard(key)
+    
+    def start(self):
+        """Start polling for due entries in a background thread"""
+        if self._thread is not None:
+            return
+        
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="refresh-ahead-scheduler", daemon=True)
+        self._thread.start()
+    
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_pending()
+            except Exception as e:
+                print(f"Error in refresh-ahead scheduler: {e}")
+            self._stop.wait(self.poll_interval)
+    
+    def stop(self, wait=True):
+        """Stop polling; with wait, also let running refreshes finish"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=True)
+            self._executor = None
@@ -1,5 +1,10 @@
+import asyncio
+import threading
 import time
 import random
+from collections import deque
+from contextlib import asynccontextmanager
+from concurrent.futures import Future, wait, FIRST_COMPLETED
 from functools import wraps
 from typing import Callable, Any, Tuple, Type
 
@@ -109,7 +114,8 @@ def safe_execute(func: Callable, fallback_value=None, log_errors=True) -> Any:
             print(f"Error in {func.__name__}: {str(e)}")
         return fallback_value
 
-def batch_execute(functions: list, max_failures=None, continue_on_error=True) -> list:
+def batch_execute(functions: list, max_failures=None, continue_on_error=True,
+                  parallel=False, max_workers=None, task_timeout=None, timeout=None) -> list:
     """
     Execute multiple functions with error handling
     
@@ -117,10 +123,19 @@ def batch_execute(functions: list, max_failures=None, continue_on_error=True) ->
         functions: List of functions to execute
         max_failures: Maximum allowed failures before stopping
         continue_on_error: Whether to continue if a function fails
+        parallel: Run the functions concurrently on worker threads
+        max_workers: Maximum functions run at once; the rest wait for a free worker (parallel mode only)
+        task_timeout: Seconds a single function may run, from when it starts, before it counts as failed
+            (parallel mode only)
+        timeout: Seconds the whole batch may run before unfinished functions count as failed (parallel mode only)
         
     Returns:
         List of results (None for failed functions)
     """
+    if parallel:
+        return _parallel_batch_execute(functions, max_failures, continue_on_error,
+                                       max_workers, task_timeout, timeout)
+    
     results = []
     failures = 0
     max_failures = max_failures or len(functions)
@@ -140,6 +155,97 @@ def batch_execute(functions: list, max_failures=None, continue_on_error=True) ->
     
     return results
 
+def _start_task(func):
+    """Run a function on a daemon thread; returns a Future for its result"""
+    future = Future()
+    future.set_running_or_notify_cancel()
+    
+    def run():
+        try:
+            result = func()
+        except BaseException as e:
+            future.set_exception(e)
+        else:
+            future.set_result(result)
+    
+    threading.Thread(target=run, name="batch-task", daemon=True).start()
+    return future
+
+def _parallel_batch_execute(functions, max_failures, continue_on_error, max_workers, task_timeout, timeout):
+    """
+    Run functions on worker threads, keeping results in input order
+    
+    At most max_workers functions run at once; the rest are queued, and a
+    queued function's task_timeout only starts once it gets a worker. The
+    batch timeout covers queued functions too. Functions that fail or time
+    out, and queued ones never started, leave None in their slot.
+    
+    Timed out functions cannot be interrupted. Their threads are abandoned
+    (freeing their worker slot) and their eventual results discarded; they
+    are daemon threads, so they don't keep the process alive either.
+    """
+    results = [None] * len(functions)
+    if not functions:
+        return results
+    
+    failures = 0
+    max_failures = max_failures or len(functions)
+    max_workers = max_workers or len(functions)
+    queued = deque(range(len(functions)))
+    futures = {}
+    started_at = {}
+    pending = set()
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    
+    while queued or pending:
+        # Start queued functions while there are free workers
+        while queued and len(pending) < max_workers:
+            i = queued.popleft()
+            future = _start_task(functions[i])
+            futures[future] = i
+            started_at[i] = time.monotonic()
+            pending.add(future)
+        
+        # Wake up for the earliest batch or task deadline
+        now = time.monotonic()
+        wait_timeout = None
+        if deadline is not None:
+            wait_timeout = max(0, deadline - now)
+        if task_timeout is not None:
+            task_wait = min(max(0, started_at[futures[future]] + task_timeout - now) for future in pending)
+            wait_timeout = task_wait if wait_timeout is None else min(wait_timeout, task_wait)
+        
+        done, pending = wait(pending, timeout=wait_timeout, return_when=FIRST_COMPLETED)
+        
+        for future in done:
+            i = futures[future]
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                failures += 1
+                print(f"Function {i} failed: {str(e)}")
+        
+        now = time.monotonic()
+        timed_out = []
+        if deadline is not None and now >= deadline:
+            timed_out = sorted([futures[future] for future in pending] + list(queued))
+            pending = set()
+            queued.clear()
+        elif task_timeout is not None:
+            expired = [future for future in pending if now - started_at[futures[future]] >= task_timeout]
+            pending.difference_update(expired)
+            timed_out = sorted(futures[future] for future in expired)
+        
+        for i in timed_out:
+            failures += 1
+            print(f"Function {i} timed out")
+        
+        if failures >= max_failures and not continue_on_error:
+            print(f"Stopping batch execution after {failures} failures")
+            break
+    
+    return results
+
 # Rate limiting utilities
 class RateLimiter:
     """Simple rate limiter using token bucket algorithm"""
@@ -174,6 +280,52 @@ class RateLimiter:
             return func(*args, **kwargs)
         return wrapper
 
+class AsyncRequestLimiter:
+    """
+    Limits async API calls by concurrency, requests per minute and tokens per minute
+    
+    Create one per event loop run; asyncio primitives can't be shared
+    between loops.
+    """
+    
+    def __init__(self, max_in_flight=4, requests_per_minute=500, tokens_per_minute=30000):
+        """
+        Initialize limiter
+        
+        Args:
+            max_in_flight: Maximum requests running at once
+            requests_per_minute: Maximum requests started in any 60 second window
+            tokens_per_minute: Maximum estimated tokens in any 60 second window
+        """
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+        self._lock = asyncio.Lock()
+        self._window = deque()  # (start time, tokens) of requests in the last minute
+    
+    async def _reserve(self, tokens):
+        """Wait until a request of `tokens` fits both per-minute limits, then record it"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                while self._window and now - self._window[0][0] >= 60:
+                    self._window.popleft()
+                
+                used = sum(window_tokens for _, window_tokens in self._window)
+                # A request larger than the whole token limit goes alone in an empty window
+                if len(self._window) < self.requests_per_minute and (used + tokens <= self.tokens_per_minute or not self._window):
+                    self._window.append((now, tokens))
+                    return
+                
+                await asyncio.sleep(60 - (now - self._window[0][0]))
+    
+    @asynccontextmanager
+    async def slot(self, tokens=0):
+        """Hold a request slot: waits for a free concurrency slot and per-minute capacity"""
+        async with self._semaphore:
+            await self._reserve(tokens)
+            yield
+
 # Global rate limiters
 api_rate_limiter = RateLimiter(calls_per_second=2)  # 2 calls per second
 web_rate_limiter = RateLimiter(calls_per_second=0.5)  # 1 call every 2 seconds
\ No newline at end of file
@@ -1,23 +1,67 @@
 import os
+import json
+import time
+import asyncio
 import openai
 from dotenv import load_dotenv
+from agent.summary_cache import summary_cache, summary_key
+from agent.retry_handler import api_rate_limiter, AsyncRequestLimiter
+from agent.model_router import model_router
 
 load_dotenv()
 
 client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
 
-def summarize_text(text):
+SYSTEM_PROMPT = "You are an assistant that summarizes YouTube video titles into short, catchy trend summaries for a newsletter."
+PROMPT_TEMPLATE = "Summarize this YouTube video title in 1 short sentence:\n{text}"
+
+# Seconds a summary request may take before the local fallback is used instead
+SUMMARY_DEADLINE = float(os.getenv("SUMMARY_DEADLINE", "20"))
+
+# Send a duplicate request once one has run longer than this percentile of the
+# model's recent request latencies, kept across runs (0 disables hedging)
+SUMMARY_HEDGE_PERCENTILE = float(os.getenv("SUMMARY_HEDGE_PERCENTILE", "0"))
+
+# Seconds after which a request is hedged while its model has too few recorded
+# latencies for the percentile (0 means no hedging until it has them)
+SUMMARY_HEDGE_DELAY = float(os.getenv("SUMMARY_HEDGE_DELAY", "0"))
+
+def extractive_summary(text, max_chars=120):
+    """
+    Build a one-line summary locally from a summary context, without the network
+    
+    Contexts look like "Reddit Post: <title> | r/<subreddit> | ..."; the
+    result keeps the title and the first piece of metadata, e.g.
+    "<title> (Reddit Post, r/<subreddit>)".
+    """
+    parts = [part.strip() for part in text.split(" | ") if part.strip()]
+    if not parts:
+        return ""
+    
+    label, separator, title = parts[0].partition(": ")
+    if not separator:
+        label, title = "", parts[0]
+    
+    details = [label] if label else []
+    details += [part for part in parts[1:2] if not part.startswith("Top comments")]
+    summary = f"{title} ({', '.join(details)})" if details else title
+    
+    if len(summary) > max_chars:
+        summary = summary[:max_chars - 3].rsplit(" ", 1)[0] + "..."
+    return summary
+
+def _request_summary(text, model, deadline=SUMMARY_DEADLINE):
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o",
+        response = client.with_options(timeout=deadline, max_retries=0).chat.completions.create(
+            model=model,
             messages=[
                 {
                     "role": "system",
-                    "content": "You are an assistant that summarizes YouTube video titles into short, catchy trend summaries for a newsletter."
+                    "content": SYSTEM_PROMPT
                 },
                 {
                     "role": "user",
-                    "content": f"Summarize this YouTube video title in 1 short sentence:\n{text}"
+                    "content": PROMPT_TEMPLATE.format(text=text)
                 }
             ],
             max_tokens=50,
@@ -26,4 +70,486 @@ def summarize_text(text):
         return response.choices[0].message.content.strip()
     except Exception as e:
         print(f"Error summarizing text: {e}")
-        return "Summary unavailable."
+        return None
+
+BATCH_SYSTEM_PROMPT = (
+    "You are an assistant that summarizes trending content into short, catchy trend summaries for a newsletter. "
+    "You receive items as lines like \"[3] text\" and reply with a JSON object of the form "
+    "{\"summaries\": {\"3\": \"summary\"}} holding a 1-sentence summary for every item id."
+)
+BATCH_PROMPT_TEMPLATE = "Summarize each of these items in 1 short sentence:\n{items}"
+
+# Tokens (prompt plus expected completion) allowed per batch request; larger runs are split
+BATCH_TOKEN_BUDGET = 3000
+BATCH_MAX_ITEMS = 20
+
+# Completion tokens allowed per item, as for single summaries
+BATCH_TOKENS_PER_ITEM = 50
+
+# Rounds of re-sending items missing from batch responses
+BATCH_MAX_ATTEMPTS = 3
+
+# Limits for the async path (see AsyncRequestLimiter)
+SUMMARY_MAX_IN_FLIGHT = int(os.getenv("SUMMARY_MAX_IN_FLIGHT", "4"))
+SUMMARY_REQUESTS_PER_MINUTE = int(os.getenv("SUMMARY_REQUESTS_PER_MINUTE", "500"))
+SUMMARY_TOKENS_PER_MINUTE = int(os.getenv("SUMMARY_TOKENS_PER_MINUTE", "30000"))
+
+def estimate_tokens(text):
+    """Rough token count (about 4 characters per token for English text)"""
+    return len(text) // 4 + 1
+
+def _format_item(item_id, text):
+    # One line per item so ids can't be confused with text
+    return f"[{item_id}] {' '.join(text.split())}"
+
+def _plan_batches(items, token_budget=BATCH_TOKEN_BUDGET, max_items=BATCH_MAX_ITEMS):
+    """
+    Split (index, text) pairs into batches that fit the token budget
+    
+    An item too large for the budget on its own still gets a batch of one.
+    """
+    overhead = estimate_tokens(BATCH_SYSTEM_PROMPT + BATCH_PROMPT_TEMPLATE)
+    batches = []
+    batch = []
+    used = overhead
+    
+    for index, text in items:
+        cost = estimate_tokens(_format_item(len(batch) + 1, text)) + BATCH_TOKENS_PER_ITEM
+        if batch and (used + cost > token_budget or len(batch) >= max_items):
+            batches.append(batch)
+            batch = []
+            used = overhead
+        batch.append((index, text))
+        used += cost
+    
+    if batch:
+        batches.append(batch)
+    return batches
+
+def _parse_batch_response(content, ids):
+    """
+    Extract summaries by item id from a batch response
+    
+    Accepts {"summaries": {id: summary}} or a list of {"id", "summary"}
+    objects; entries are matched by id, never by position, and unknown ids
+    or empty summaries are dropped.
+    """
+    data = json.loads(content)
+    summaries = data.get('summaries', data) if isinstance(data, dict) else data
+    
+    if isinstance(summaries, list):
+        summaries = {str(entry.get('id')): entry.get('summary') for entry in summaries if isinstance(entry, dict)}
+    
+    return {
+        str(item_id): summary.strip()
+        for item_id, summary in summaries.items()
+        if str(item_id) in ids and isinstance(summary, str) and summary.strip()
+    }
+
+def _batch_request(batch, model):
+    """
+    Build the chat completion arguments for a batch of (index, text) pairs
+    
+    Returns:
+        (request kwargs, dict of item id -> index, estimated total tokens)
+    """
+    ids = {str(position): index for position, (index, _) in enumerate(batch, 1)}
+    items = "\n".join(_format_item(position, text) for position, (_, text) in enumerate(batch, 1))
+    prompt = BATCH_PROMPT_TEMPLATE.format(items=items)
+    max_tokens = BATCH_TOKENS_PER_ITEM * len(batch) + 20
+    
+    request = dict(
+        model=model,
+        messages=[
+            {
+                "role": "system",
+                "content": BATCH_SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ],
+        response_format={"type": "json_object"},
+        max_tokens=max_tokens,
+        temperature=0.7,
+    )
+    return request, ids, estimate_tokens(BATCH_SYSTEM_PROMPT + prompt) + max_tokens
+
+def _request_batch(batch, tier, deadline=SUMMARY_DEADLINE):
+    """
+    Summarize one batch of (index, text) pairs in a single JSON-mode request
+    
+    The request goes to the model model_router currently picks for tier.
+    
+    Returns:
+        (dict of index -> summary for the items the response covered,
+         seconds taken, failure reason: None, "deadline" or "error", model used)
+    """
+    api_rate_limiter.wait_if_needed()
+    model = model_router.resolve(tier)
+    request, ids, _ = _batch_request(batch, model)
+    started = time.monotonic()
+    
+    try:
+        response = client.with_options(timeout=deadline, max_retries=0).chat.completions.create(**request)
+        summaries = _parse_batch_response(response.choices[0].message.content, ids)
+    except openai.APITimeoutError:
+        print(f"Batch of {len(batch)} items missed the {deadline}s summary deadline on {model}")
+        model_router.record(model, deadline, len(batch))
+        return {}, time.monotonic() - started, "deadline", model
+    except Exception as e:
+        print(f"Error summarizing batch of {len(batch)} items: {e}")
+        return {}, time.monotonic() - started, "error", model
+    
+    latency = time.monotonic() - started
+    model_router.record(model, latency, len(batch))
+    return {ids[item_id]: summary for item_id, summary in summaries.items()}, latency, None, model
+
+async def _acomplete(async_client, limiter, request, tokens, deadline, hedge_after, tier):
+    """
+    Run a chat completion within a deadline, hedging with a duplicate request
+    
+    Each attempt picks its model from model_router once it holds a limiter
+    slot, so a model demoted while the request queued is skipped. Once the
+    first request has run for hedge_after seconds a second, identical
+    request is sent; whichever succeeds first is used and the other is
+    cancelled. Raises asyncio.TimeoutError past the deadline.
+    
+    Returns:
+        (response, model used, whether a hedged request was sent)
+    """
+    async def attempt():
+        async with limiter.slot(tokens):
+            model = model_router.resolve(tier)
+            return await async_client.chat.completions.create(**dict(request, model=model)), model
+    
+    started = time.monotonic()
+    pending = {asyncio.create_task(attempt())}
+    hedged = False
+    error = None
+    
+    try:
+        while pending:
+            elapsed = time.monotonic() - started
+            if elapsed >= deadline:
+                raise asyncio.TimeoutError()
+            
+            timeout = deadline - elapsed
+            if not hedged and hedge_after is not None:
+                timeout = min(timeout, max(0, hedge_after - elapsed))
+            
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return (*task.result(), hedged)
+                error = task.exception()
+            
+            if not done and not hedged and hedge_after is not None and time.monotonic() - started < deadline:
+                pending.add(asyncio.create_task(attempt()))
+                hedged = True
+        
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+def _hedge_after(model, hedge_percentile, hedge_delay):
+    """Seconds after which to hedge a request to model, or None not to"""
+    if not hedge_percentile:
+        return None
+    return model_router.percentile(model, hedge_percentile) or hedge_delay or None
+
+async def _arequest_batch(batch, tier, async_client, limiter, deadline=SUMMARY_DEADLINE,
+                          hedge_percentile=SUMMARY_HEDGE_PERCENTILE, hedge_delay=SUMMARY_HEDGE_DELAY):
+    """Async version of _request_batch, with limiter slots and optional hedging"""
+    model = model_router.resolve(tier)
+    request, ids, tokens = _batch_request(batch, model)
+    hedge_after = _hedge_after(model, hedge_percentile, hedge_delay)
+    started = time.monotonic()
+    
+    try:
+        response, model, hedged = await _acomplete(async_client, limiter, request, tokens, deadline, hedge_after, tier)
+        if hedged:
+            print(f"Hedged slow summary request after {hedge_after:.1f}s")
+        summaries = _parse_batch_response(response.choices[0].message.content, ids)
+    except asyncio.TimeoutError:
+        print(f"Batch of {len(batch)} items missed the {deadline}s summary deadline on {model}")
+        await asyncio.to_thread(model_router.record, model, deadline, len(batch))
+        return {}, time.monotonic() - started, "deadline", model
+    except Exception as e:
+        print(f"Error summarizing batch of {len(batch)} items: {e}")
+        return {}, time.monotonic() - started, "error", model
+    
+    latency = time.monotonic() - started
+    await asyncio.to_thread(model_router.record, model, latency, len(batch))
+    return {ids[item_id]: summary for item_id, summary in summaries.items()}, latency, None, model
+
+def _new_records(count):
+    return [{'summary': None, 'latency': 0.0, 'reason': None, 'model': None} for _ in range(count)]
+
+def _route(texts, sources=None):
+    """Tier index per text from its length and source"""
+    sources = sources or [None] * len(texts)
+    return [model_router.tier_for(estimate_tokens(text), source) for text, source in zip(texts, sources)]
+
+def _plan_routed_batches(remaining, tiers, token_budget, max_items):
+    """Plan batches separately per tier; returns (tier, batch) pairs"""
+    by_tier = {}
+    for index, text in remaining:
+        by_tier.setdefault(tiers[index], []).append((index, text))
+    
+    return [(tier, batch) for tier, items in sorted(by_tier.items())
+            for batch in _plan_batches(items, token_budget, max_items)]
+
+def _apply_batch_result(records, batch, result):
+    """Fill one batch's outcome into per-item records; returns indexes that should be re-sent"""
+    summaries, latency, reason, model = result
+    retry = []
+    
+    for index, _ in batch:
+        record = records[index]
+        record['latency'] += latency
+        record['model'] = model
+        if index in summaries:
+            record['summary'] = summaries[index]
+            record['reason'] = None
+        else:
+            # Missing from a response or a failed request is retried; a missed deadline is final
+            record['reason'] = reason or "missing"
+            if reason != "deadline":
+                retry.append(index)
+    
+    return retry
+
+def summarize_batch(texts, token_budget=BATCH_TOKEN_BUDGET, max_items=BATCH_MAX_ITEMS, max_attempts=BATCH_MAX_ATTEMPTS,
+                    tiers=None):
+    """
+    Summarize many contexts with as few requests as possible
+    
+    Contexts are packed into JSON-mode requests that fit token_budget, one
+    set of batches per model tier. Items a response leaves out (or answers
+    with an empty summary) are re-sent in new batches, up to max_attempts
+    rounds in total.
+    
+    Args:
+        texts: Contexts to summarize
+        token_budget: Maximum prompt plus completion tokens per request
+        max_items: Maximum items per request
+        max_attempts: Rounds of requests before giving up on missing items
+        tiers: model_router tier per text (routed by length if omitted)
+    
+    Returns:
+        Summaries in the same order as texts (None where none was returned)
+    """
+    records = _summarize_batch_records(texts, token_budget, max_items, max_attempts, tiers)
+    return [record['summary'] for record in records]
+
+def _summarize_batch_records(texts, token_budget, max_items, max_attempts, tiers=None):
+    """summarize_batch returning per-item records (summary, latency, failure reason, model)"""
+    tiers = tiers or _route(texts)
+    records = _new_records(len(texts))
+    remaining = list(enumerate(texts))
+    
+    for attempt in range(max_attempts):
+        if not remaining:
+            break
+        if attempt:
+            print(f"Re-sending {len(remaining)} items missing from batch summaries")
+        
+        retry = []
+        for tier, batch in _plan_routed_batches(remaining, tiers, token_budget, max_items):
+            retry += _apply_batch_result(records, batch, _request_batch(batch, tier))
+        
+        remaining = [(index, texts[index]) for index in retry]
+    
+    return records
+
+async def asummarize_batch(texts, async_client, limiter, token_budget=BATCH_TOKEN_BUDGET, max_items=BATCH_MAX_ITEMS,
+                           max_attempts=BATCH_MAX_ATTEMPTS, deadline=SUMMARY_DEADLINE,
+                           hedge_percentile=SUMMARY_HEDGE_PERCENTILE, hedge_delay=SUMMARY_HEDGE_DELAY, tiers=None):
+    """
+    Async version of summarize_batch: the batches of each round are sent concurrently
+    
+    A failed batch only leaves its own items missing (to be re-sent);
+    the other batches carry on. Each request has a deadline, past which its
+    items are not retried, and is hedged per SUMMARY_HEDGE_PERCENTILE and SUMMARY_HEDGE_DELAY.
+    
+    Args:
+        texts: Contexts to summarize
+        async_client: openai.AsyncOpenAI client
+        limiter: AsyncRequestLimiter bounding requests in flight, per minute and tokens per minute
+        token_budget: Maximum prompt plus completion tokens per request
+        max_items: Maximum items per request
+        max_attempts: Rounds of requests before giving up on missing items
+        deadline: Seconds each request may take
+        hedge_percentile: Latency percentile after which a request is hedged (0 disables hedging)
+        hedge_delay: Seconds after which to hedge while the model has too few latencies for the percentile
+        tiers: model_router tier per text (routed by length if omitted)
+    
+    Returns:
+        Per-item records in the same order as texts: summary (None where none
+        was returned), latency in seconds, failure reason
+        ("deadline", "error", "missing" or None) and model used
+    """
+    tiers = tiers or _route(texts)
+    records = _new_records(len(texts))
+    remaining = list(enumerate(texts))
+    
+    for attempt in range(max_attempts):
+        if not remaining:
+            break
+        if attempt:
+            print(f"Re-sending {len(remaining)} items missing from batch summaries")
+        
+        batches = _plan_routed_batches(remaining, tiers, token_budget, max_items)
+        results = await asyncio.gather(*(_arequest_batch(batch, tier, async_client, limiter, deadline, hedge_percentile,
+                                                         hedge_delay)
+                                         for tier, batch in batches))
+        
+        retry = []
+        for (_, batch), result in zip(batches, results):
+            retry += _apply_batch_result(records, batch, result)
+        
+        remaining = [(index, texts[index]) for index in retry]
+    
+    return records
+
+def _key(text, model, batched=False):
+    if batched:
+        return summary_key(BATCH_SYSTEM_PROMPT, BATCH_PROMPT_TEMPLATE, model, text)
+    return summary_key(SYSTEM_PROMPT, PROMPT_TEMPLATE, model, text)
+
+def summarize_text(text, source=None, deadline=SUMMARY_DEADLINE):
+    """
+    Summarize one context, reusing a stored summary of identical input
+    
+    The model is picked by model_router from the context's length and source.
+    Falls back to extractive_summary() if the request fails or takes longer than deadline seconds.
+    """
+    tier = model_router.tier_for(estimate_tokens(text), source)
+    model = model_router.resolve(tier)
+    key = _key(text, model)
+    summary = summary_cache.get(key)
+    if summary is not None:
+        return summary
+    
+    api_rate_limiter.wait_if_needed()
+    started = time.monotonic()
+    summary = _request_summary(text, model, deadline)
+    if summary is None:
+        return extractive_summary(text)
+    
+    model_router.record(model, time.monotonic() - started)
+    summary_cache.put(key, summary, model)
+    return summary
+
+def _lookup_cached(texts, sources=None):
+    """
+    Route a run's contexts and look them up in the summary cache
+    
+    Each context is looked up under the model its tier would use right now.
+    
+    Returns:
+        (cache key per text, dict of key -> (cached summary, model),
+         dict of key -> (text still to summarize, tier))
+    """
+    tiers = _route(texts, sources)
+    models = [model_router.resolve(tier) for tier in tiers]
+    keys = [_key(text, model, batched=True) for text, model in zip(texts, models)]
+    summaries = summary_cache.get_many(keys)
+    cached = {key: (summaries[key], model) for key, model in zip(keys, models) if key in summaries}
+    
+    # Each distinct uncached context is sent once
+    pending = {key: (text, tier) for key, text, tier in zip(keys, texts, tiers) if key not in summaries}
+    if summaries:
+        print(f"Reusing {len(set(keys)) - len(pending)} cached summaries, requesting {len(pending)}")
+    
+    return keys, cached, pending
+
+def _store_new(pending, records):
+    """
+    Cache newly generated summaries under the model that produced them
+    
+    Returns:
+        Per-item details by lookup key, using the local fallback where needed
+    """
+    details = {}
+    
+    for (key, (text, _)), record in zip(pending.items(), records):
+        if record['summary'] is None:
+            details[key] = {'summary': extractive_summary(text), 'source': "fallback", 'model': record['model'],
+                            'latency': record['latency'], 'fallback_reason': record['reason']}
+        else:
+            summary_cache.put(_key(text, record['model'], batched=True), record['summary'], record['model'])
+            details[key] = {'summary': record['summary'], 'source': "llm", 'model': record['model'],
+                            'latency': record['latency'], 'fallback_reason': None}
+    
+    return details
+
+def _item_details(keys, cached, new_details):
+    cached_details = {key: {'summary': summary, 'source': "cache", 'model': model, 'latency': 0.0,
+                            'fallback_reason': None}
+                      for key, (summary, model) in cached.items()}
+    return [dict(new_details.get(key) or cached_details[key]) for key in keys]
+
+def summarize_texts(texts, sources=None):
+    """
+    Summarize several contexts, calling the API only for ones not summarized before
+    
+    Identical contexts are summarized once, summaries are looked up in the
+    persistent summary cache (keyed by prompt, model and context), and the
+    rest are routed to a model tier by model_router and summarized together
+    in batched requests.
+    
+    Args:
+        texts: Contexts to summarize
+        sources: Source name per text, used for routing (optional)
+    
+    Returns:
+        Summaries in the same order as texts (local extractive summaries where summarizing failed)
+    """
+    keys, cached, pending = _lookup_cached(texts, sources)
+    records = _summarize_batch_records([text for text, _ in pending.values()], BATCH_TOKEN_BUDGET, BATCH_MAX_ITEMS,
+                                       BATCH_MAX_ATTEMPTS, [tier for _, tier in pending.values()])
+    return [item['summary'] for item in _item_details(keys, cached, _store_new(pending, records))]
+
+async def asummarize_items(texts, sources=None, max_in_flight=SUMMARY_MAX_IN_FLIGHT, requests_per_minute=SUMMARY_REQUESTS_PER_MINUTE,
+                           tokens_per_minute=SUMMARY_TOKENS_PER_MINUTE, max_items=BATCH_MAX_ITEMS,
+                           deadline=SUMMARY_DEADLINE, hedge_percentile=SUMMARY_HEDGE_PERCENTILE,
+                           hedge_delay=SUMMARY_HEDGE_DELAY):
+    """
+    Async version of summarize_texts with concurrent, rate-limited requests and per-item details
+    
+    Args:
+        texts: Contexts to summarize
+        sources: Source name per text, used for routing (optional)
+        max_in_flight: Maximum requests running at once
+        requests_per_minute: Maximum requests per minute
+        tokens_per_minute: Maximum estimated tokens per minute
+        max_items: Maximum items per request (smaller batches mean more concurrency)
+        deadline: Seconds each request may take before its items use the local fallback
+        hedge_percentile: Latency percentile after which a request is hedged (0 disables hedging)
+        hedge_delay: Seconds after which to hedge while the model has too few latencies for the percentile
+    
+    Returns:
+        One dict per text, in order: summary, source ("cache", "llm" or
+        "fallback"), model, latency in seconds and fallback_reason
+        ("deadline", "error", "missing" or None)
+    """
+    keys, cached, pending = await asyncio.to_thread(_lookup_cached, texts, sources)
+    new_details = {}
+    
+    if pending:
+        limiter = AsyncRequestLimiter(max_in_flight, requests_per_minute, tokens_per_minute)
+        async with openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY")) as async_client:
+            records = await asummarize_batch([text for text, _ in pending.values()], async_client, limiter,
+                                             max_items=max_items, deadline=deadline, hedge_percentile=hedge_percentile,
+                                             hedge_delay=hedge_delay, tiers=[tier for _, tier in pending.values()])
+        new_details = await asyncio.to_thread(_store_new, pending, records)
+    
+    return _item_details(keys, cached, new_details)
+
+async def asummarize_texts(texts, **options):
+    """Async version of summarize_texts (see asummarize_items for sources and options)"""
+    return [item['summary'] for item in await asummarize_items(texts, **options)]
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+def summary_key(system_prompt, prompt_template, model, context):
+    """Hash identifying a summary: same prompt, model and input always give the same key"""
+    material = json.dumps([system_prompt, prompt_template, model, context], separators=(',', ':'))
+    return hashlib.sha256(material.encode()).hexdigest()
+
+class SummaryCache:
+    """
+    Persistent store of LLM summaries keyed by summary_key()
+    
+    Summaries older than max_age are dropped, and once the store grows past
+    max_bytes the least recently used summaries go first. Each thread uses
+    its own SQLite connection.
+    """
+    
+    def __init__(self, path=os.path.join("cache", "summaries.sqlite3"), max_age=7 * 24 * 3600,
+                 max_bytes=5 * 1024 * 1024):
+        """
+        Initialize summary cache
+        
+        Args:
+            path: SQLite database file
+            max_age: Seconds a summary is kept after it was generated
+            max_bytes: Approximate maximum total size of stored summaries
+        """
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        
+        self.path = path
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS summaries ("
+            " key TEXT PRIMARY KEY,"
+            " summary TEXT NOT NULL,"
+            " model TEXT NOT NULL,"
+            " created_at REAL NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " size INTEGER NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_summaries_last_used ON summaries (last_used)")
+        conn.commit()
+    
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            self._local.conn = conn
+        return conn
+    
+    def _count(self, name, amount=1):
+        with self._stats_lock:
+            self.stats[name] += amount
+    
+    def get_many(self, keys):
+        """
+        Look up several summaries at once
+        
+        Args:
+            keys: Summary keys
+        
+        Returns:
+            Dict of key -> summary for the keys that are stored and not too old
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+        
+        now = time.time()
+        conn = self._connection()
+        placeholders = ",".join("?" * len(keys))
+        
+        with conn:
+            rows = conn.execute(
+                f"SELECT key, summary FROM summaries WHERE key IN ({placeholders}) AND created_at >= ?",
+                (*keys, now - self.max_age)
+            ).fetchall()
+            conn.executemany("UPDATE summaries SET last_used = ? WHERE key = ?", [(now, key) for key, _ in rows])
+        
+        self._count('hits', len(rows))
+        self._count('misses', len(keys) - len(rows))
+        return dict(rows)
+    
+    def get(self, key):
+        """Get one summary, or None"""
+        return self.get_many([key]).get(key)
+    
+    def put(self, key, summary, model):
+        """Store a summary, evicting old and least recently used ones if needed"""
+        now = time.time()
+        conn = self._connection()
+        
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO summaries (key, summary, model, created_at, last_used, size) VALUES (?, ?, ?, ?, ?, ?)",
+                (key, summary, model, now, now, len(summary.encode()))
+            )
+        
+        self.evict()
+    
+    def evict(self):
+        """
+        Drop summaries older than max_age, then least recently used ones beyond max_bytes
+        
+        Returns:
+            Number of summaries dropped
+        """
+        conn = self._connection()
+        
+        with conn:
+            evicted = conn.execute("DELETE FROM summaries WHERE created_at < ?", (time.time() - self.max_age,)).rowcount
+            
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM summaries").fetchone()[0]
+            if total > self.max_bytes:
+                # Walk from least recently used until enough has been freed
+                excess = total - self.max_bytes
+                doomed = []
+                for key, size in conn.execute("SELECT key, size FROM summaries ORDER BY last_used"):
+                    if excess <= 0:
+                        break
+                    doomed.append((key,))
+                    excess -= size
+                conn.executemany("DELETE FROM summaries WHERE key = ?", doomed)
+                evicted += len(doomed)
+        
+        self._count('evictions', evicted)
+        return evicted
+    
+    def clear(self):
+        """Drop every summary; returns the number dropped"""
+        conn = self._connection()
+        with conn:
+            return conn.execute("DELETE FROM summaries").rowcount
+    
+    def info(self):
+        """Stored count and size, plus hit/miss/eviction counters"""
+        count, size = self._connection().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM summaries"
+        ).fetchone()
+        with self._stats_lock:
+            return dict(self.stats, entries=count, size_bytes=size)
+
+# Global summary cache instance
+summary_cache = SummaryCache()
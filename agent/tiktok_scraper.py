@@ -1,10 +1,16 @@
 import requests
 import json
 import time
+import asyncio
 from dotenv import load_dotenv
+from agent.cache_manager import memoize
 
 load_dotenv()
 
+# Seconds results are memoized per distinct arguments
+MEMO_TTL = 600
+
+@memoize(MEMO_TTL, limit_arg='limit')
 def fetch_tiktok_trending(limit=5):
     """Fetch trending TikTok content (placeholder implementation)"""
     try:
@@ -58,6 +64,7 @@ def fetch_tiktok_trending(limit=5):
         print(f"Error fetching TikTok trends: {e}")
         return []
 
+@memoize(MEMO_TTL)
 def fetch_tiktok_hashtags():
     """Fetch trending TikTok hashtags"""
     try:
@@ -75,6 +82,7 @@ def fetch_tiktok_hashtags():
         print(f"Error fetching TikTok hashtags: {e}")
         return []
 
+@memoize(MEMO_TTL)
 def fetch_tiktok_sounds():
     """Fetch trending TikTok sounds/audio"""
     try:
@@ -106,4 +114,16 @@ def fetch_tiktok_sounds():
         
     except Exception as e:
         print(f"Error fetching TikTok sounds: {e}")
-        return []
\ No newline at end of file
+        return []
+
+async def afetch_tiktok_trending(limit=5):
+    """Async version of fetch_tiktok_trending"""
+    return await asyncio.to_thread(fetch_tiktok_trending, limit)
+
+async def afetch_tiktok_hashtags():
+    """Async version of fetch_tiktok_hashtags"""
+    return await asyncio.to_thread(fetch_tiktok_hashtags)
+
+async def afetch_tiktok_sounds():
+    """Async version of fetch_tiktok_sounds"""
+    return await asyncio.to_thread(fetch_tiktok_sounds)
@@ -1,11 +1,17 @@
 import requests
 import json
 import time
+import asyncio
 from dotenv import load_dotenv
 import os
+from agent.cache_manager import memoize
 
 load_dotenv()
 
+# Seconds results are memoized per distinct arguments
+MEMO_TTL = 480
+
+@memoize(MEMO_TTL, limit_arg='limit')
 def fetch_twitter_trending(limit=5):
     """Fetch trending topics from Twitter/X using web scraping"""
     try:
@@ -29,6 +35,7 @@ def fetch_twitter_trending(limit=5):
         print(f"Error fetching Twitter trends: {e}")
         return []
 
+@memoize(MEMO_TTL)
 def fetch_twitter_hashtags():
     """Fetch trending hashtags (placeholder implementation)"""
     try:
@@ -47,6 +54,7 @@ def fetch_twitter_hashtags():
         print(f"Error fetching Twitter hashtags: {e}")
         return []
 
+@memoize(MEMO_TTL, limit_arg='limit')
 def fetch_tech_twitter_accounts(limit=3):
     """Fetch popular posts from tech Twitter accounts"""
     try:
@@ -81,4 +89,16 @@ def fetch_tech_twitter_accounts(limit=3):
         
     except Exception as e:
         print(f"Error fetching tech Twitter posts: {e}")
-        return []
\ No newline at end of file
+        return []
+
+async def afetch_twitter_trending(limit=5):
+    """Async version of fetch_twitter_trending"""
+    return await asyncio.to_thread(fetch_twitter_trending, limit)
+
+async def afetch_twitter_hashtags():
+    """Async version of fetch_twitter_hashtags"""
+    return await asyncio.to_thread(fetch_twitter_hashtags)
+
+async def afetch_tech_twitter_accounts(limit=3):
+    """Async version of fetch_tech_twitter_accounts"""
+    return await asyncio.to_thread(fetch_tech_twitter_accounts, limit)
@@ -1,15 +1,70 @@
 import os
-import requests
+import asyncio
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from googleapiclient.discovery import build
 from dotenv import load_dotenv
+from agent.cache_manager import cache, cached_request, memoize, NegativeCache
 
 load_dotenv()
 
+# Seconds results are memoized per distinct arguments
+MEMO_TTL = 600
+
+# Quota units charged for one videos.list call
+VIDEOS_LIST_COST = 1
+
+# Failed or empty regions are retried after 1 minute, backing off to 15,
+# instead of being cached as empty for the full TTL
+REGION_NEGATIVE_CACHE = NegativeCache(ttl=60, max_ttl=900)
+
+DEFAULT_CATEGORIES = ["10", "15", "17", "19", "20", "22", "23", "24", "25", "26", "27", "28"]
+# 10=Music, 15=Pets, 17=Sports, 19=Travel, 20=Gaming, 22=People, 23=Comedy, 24=Entertainment, 25=News, 26=Style, 27=Education, 28=Science
+
+_client_local = threading.local()
+
+def get_youtube_client():
+    """
+    Get the YouTube API client, building it on first use
+
+    The underlying httplib2 connection isn't thread-safe, so one client is
+    kept per thread rather than one shared by the whole process. build()
+    reads the discovery document bundled with google-api-python-client, so
+    building a client makes no network request.
+    """
+    youtube = getattr(_client_local, 'youtube', None)
+
+    if youtube is None:
+        youtube = build("youtube", "v3", developerKey=os.getenv("YOUTUBE_API_KEY"))
+        _client_local.youtube = youtube
+
+    return youtube
+
+def _parse_videos(response, category=None):
+    """Convert a videos.list response into video dicts"""
+    videos = []
+
+    for item in response.get("items", []):
+        video = {
+            "video_id": item["id"],
+            "title": item["snippet"]["title"],
+            "url": f"https://www.youtube.com/watch?v={item['id']}",
+            "views": int(item["statistics"].get("viewCount", 0)),
+            "channel": item["snippet"]["channelTitle"],
+            "source": "youtube"
+        }
+        if category is not None:
+            video["category"] = category
+        videos.append(video)
+
+    return videos
+
+@memoize(MEMO_TTL, limit_arg='max_results')
 def fetch_youtube_trending(region_code="US", max_results=5):
     """Fetch trending videos using YouTube API with fallback"""
     try:
-        youtube = build("youtube", "v3", developerKey=os.getenv("YOUTUBE_API_KEY"))
+        youtube = get_youtube_client()
 
         request = youtube.videos().list(
             part="snippet,statistics",
@@ -19,17 +74,7 @@ def fetch_youtube_trending(region_code="US", max_results=5):
         )
         response = request.execute()
 
-        videos = []
-        for item in response.get("items", []):
-            videos.append({
-                "title": item["snippet"]["title"],
-                "url": f"https://www.youtube.com/watch?v={item['id']}",
-                "views": int(item["statistics"].get("viewCount", 0)),
-                "channel": item["snippet"]["channelTitle"],
-                "source": "youtube"
-            })
-
-        return videos
+        return _parse_videos(response)
     except Exception as e:
         print(f"Error fetching YouTube trending: {e}")
         return fetch_youtube_trending_fallback(max_results)
@@ -45,41 +90,125 @@ def fetch_youtube_trending_fallback(max_results=5):
         print(f"Error in YouTube fallback: {e}")
         return []
 
+@memoize(MEMO_TTL)
 def fetch_youtube_categories(categories=None, max_per_category=2):
-    """Fetch trending videos from multiple categories"""
+    """Fetch trending videos from multiple categories in one batched request"""
     if categories is None:
-        categories = ["10", "15", "17", "19", "20", "22", "23", "24", "25", "26", "27", "28"]
-        # 10=Music, 15=Pets, 17=Sports, 19=Travel, 20=Gaming, 22=People, 23=Comedy, 24=Entertainment, 25=News, 26=Style, 27=Education, 28=Science
-    
+        categories = DEFAULT_CATEGORIES
+
     all_videos = []
-    for category in categories[:3]:  # Limit to first 3 categories to avoid quota
-        try:
-            youtube = build("youtube", "v3", developerKey=os.getenv("YOUTUBE_API_KEY"))
-            request = youtube.videos().list(
+
+    def collect(request_id, response, exception):
+        if exception is not None:
+            print(f"Error fetching category {request_id}: {exception}")
+        else:
+            all_videos.extend(_parse_videos(response, request_id))
+
+    try:
+        youtube = get_youtube_client()
+        batch = youtube.new_batch_http_request(callback=collect)
+
+        for category in dict.fromkeys(categories):  # Batch request ids must be unique
+            batch.add(youtube.videos().list(
                 part="snippet,statistics",
                 chart="mostPopular",
                 regionCode="US",
                 maxResults=max_per_category,
                 videoCategoryId=category
-            )
-            response = request.execute()
-            
-            for item in response.get("items", []):
-                all_videos.append({
-                    "title": item["snippet"]["title"],
-                    "url": f"https://www.youtube.com/watch?v={item['id']}",
-                    "views": int(item["statistics"].get("viewCount", 0)),
-                    "channel": item["snippet"]["channelTitle"],
-                    "category": category,
-                    "source": "youtube"
-                })
-            
-            time.sleep(0.5)  # Rate limiting
-            
-        except Exception as e:
-            print(f"Error fetching category {category}: {e}")
-            continue
-    
+            ), request_id=category)
+
+        batch.execute()
+
+    except Exception as e:
+        print(f"Error fetching YouTube categories: {e}")
+
     # Sort by views and return top videos
     all_videos.sort(key=lambda x: x['views'], reverse=True)
     return all_videos[:max_per_category * 2]
+
+def _region_cache_key(region_code, max_results):
+    return f"youtube_trending:{region_code}:{max_results}"
+
+def _merge_regions(results_by_region):
+    """
+    Merge per-region trending lists by video id
+
+    Each video keeps its rank and views for every region it trends in under
+    `regions`; its top-level `views` is the highest of those.
+    """
+    merged = {}
+
+    for region_code, videos in results_by_region.items():
+        for rank, video in enumerate(videos, 1):
+            video_id = video.get('video_id') or video['url']
+            entry = merged.get(video_id)
+            if entry is None:
+                entry = merged[video_id] = dict(video, regions={})
+            entry['regions'][region_code] = {"rank": rank, "views": video['views']}
+            entry['views'] = max(entry['views'], video['views'])
+
+    return sorted(merged.values(), key=lambda x: x['views'], reverse=True)
+
+def fetch_youtube_trending_regions(region_codes, max_results=5, quota_budget=None, max_workers=4, ttl=1800):
+    """
+    Fetch trending videos for several regions concurrently and merge them
+
+    Each region is cached under its own key, so one expired region doesn't
+    refetch the others. Regions with a fresh cache entry cost no quota.
+
+    Args:
+        region_codes: ISO 3166-1 region codes, e.g. ["US", "GB", "DE"]
+        max_results: Videos fetched per region
+        quota_budget: Maximum quota units to spend on uncached regions (None = no limit)
+        max_workers: Maximum regions fetched at once
+        ttl: Time-to-live in seconds for each region's cache entry
+
+    Returns:
+        Deduplicated list of videos, most viewed first, each with per-region rank and views
+    """
+    region_codes = list(dict.fromkeys(region_codes))
+    results_by_region = {}
+    to_fetch = []
+
+    # Only fresh entries count as cached; expired ones are left in place for
+    # cached_request, which falls back to them if the region's fetch fails
+    now = time.time()
+    for region_code in region_codes:
+        entry = cache.get_entry(_region_cache_key(region_code, max_results))
+        if entry is not None and now <= entry['expires_at']:
+            results_by_region[region_code] = entry['data']
+        else:
+            to_fetch.append(region_code)
+
+    if quota_budget is not None and len(to_fetch) * VIDEOS_LIST_COST > quota_budget:
+        affordable = quota_budget // VIDEOS_LIST_COST
+        print(f"YouTube quota budget covers {affordable} of {len(to_fetch)} uncached regions, skipping {', '.join(to_fetch[affordable:])}")
+        to_fetch = to_fetch[:affordable]
+
+    def fetch_region(region_code):
+        return cached_request(
+            _region_cache_key(region_code, max_results),
+            lambda: fetch_youtube_trending(region_code, max_results),
+            ttl=ttl,
+            negative_cache=REGION_NEGATIVE_CACHE
+        )
+
+    if to_fetch:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(to_fetch))) as executor:
+            results_by_region.update(zip(to_fetch, executor.map(fetch_region, to_fetch)))
+
+    # Keep the caller's region order so ties merge deterministically
+    return _merge_regions({region_code: results_by_region[region_code]
+                           for region_code in region_codes if region_code in results_by_region})
+
+async def afetch_youtube_trending(region_code="US", max_results=5):
+    """Async version of fetch_youtube_trending (the Google API client is blocking, so it runs in a worker thread)"""
+    return await asyncio.to_thread(fetch_youtube_trending, region_code, max_results)
+
+async def afetch_youtube_categories(categories=None, max_per_category=2):
+    """Async version of fetch_youtube_categories (runs in a worker thread)"""
+    return await asyncio.to_thread(fetch_youtube_categories, categories, max_per_category)
+
+async def afetch_youtube_trending_regions(region_codes, max_results=5, quota_budget=None, max_workers=4, ttl=1800):
+    """Async version of fetch_youtube_trending_regions (runs in a worker thread)"""
+    return await asyncio.to_thread(fetch_youtube_trending_regions, region_codes, max_results, quota_budget, max_workers, ttl)
@@ -0,0 +1,64 @@
+import glob
+import time
+from agent.cache_serializers import CacheSerializer, msgpack, zstandard
+
+# Encode/decode each payload this many times per serializer
+ROUNDS = 200
+
+def load_payloads(pattern="cache/*.json"):
+    """Load the cache entries currently on disk (any serializer format)"""
+    reader = CacheSerializer()
+    payloads = []
+    for path in sorted(glob.glob(pattern)):
+        with open(path, 'rb') as f:
+            payloads.append(reader.loads(f.read()))
+    return payloads
+
+def serializer_configs():
+    """Serializer configurations available with the installed packages"""
+    configs = [
+        ("json (current)", CacheSerializer('json')),
+        ("json-compact", CacheSerializer('json-compact')),
+        ("json-compact+gzip", CacheSerializer('json-compact', 'gzip', compress_threshold=0))
+    ]
+    if zstandard is not None:
+        configs.append(("json-compact+zstd", CacheSerializer('json-compact', 'zstd', compress_threshold=0)))
+    if msgpack is not None:
+        configs.append(("msgpack", CacheSerializer('msgpack')))
+        configs.append(("msgpack+gzip", CacheSerializer('msgpack', 'gzip', compress_threshold=0)))
+        if zstandard is not None:
+            configs.append(("msgpack+zstd", CacheSerializer('msgpack', 'zstd', compress_threshold=0)))
+    return configs
+
+def benchmark(payloads, serializer):
+    """Total encoded bytes and mean encode/decode time per payload in microseconds"""
+    encoded = [serializer.dumps(payload) for payload in payloads]
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for payload in payloads:
+            serializer.dumps(payload)
+    encode_us = (time.perf_counter() - start) / (ROUNDS * len(payloads)) * 1e6
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        for raw in encoded:
+            serializer.loads(raw)
+    decode_us = (time.perf_counter() - start) / (ROUNDS * len(payloads)) * 1e6
+
+    return sum(len(raw) for raw in encoded), encode_us, decode_us
+
+if __name__ == "__main__":
+    payloads = load_payloads()
+    if not payloads:
+        print("No cache entries found in cache/")
+        exit(1)
+
+    print(f"Benchmarking {len(payloads)} cache entries ({ROUNDS} rounds)")
+    if msgpack is None or zstandard is None:
+        print("(install msgpack and zstandard to include those formats)")
+    print(f"{'serializer':<20}{'bytes':>10}{'encode us':>12}{'decode us':>12}")
+
+    for name, serializer in serializer_configs():
+        size, encode_us, decode_us = benchmark(payloads, serializer)
+        print(f"{name:<20}{size:>10}{encode_us:>12.1f}{decode_us:>12.1f}")
@@ -1,90 +1,262 @@
-from agent.youtube_scraper import fetch_youtube_trending, fetch_youtube_categories
-from agent.reddit_scraper import fetch_multiple_subreddits
-from agent.twitter_scraper import fetch_twitter_trending
-from agent.tiktok_scraper import fetch_tiktok_trending
-from agent.github_scraper import fetch_github_trending
-from agent.hackernews_scraper import fetch_hackernews_trending
-from agent.producthunt_scraper import fetch_producthunt_today
-from agent.summarizer import summarize_text
+import os
+import sys
+import time
+import heapq
+import asyncio
+from agent.youtube_scraper import fetch_youtube_trending, fetch_youtube_categories, afetch_youtube_trending
+from agent.reddit_scraper import fetch_multiple_subreddits, afetch_multiple_subreddits
+from agent.twitter_scraper import fetch_twitter_trending, afetch_twitter_trending
+from agent.tiktok_scraper import fetch_tiktok_trending, afetch_tiktok_trending
+from agent.github_scraper import fetch_github_trending, afetch_github_trending
+from agent.hackernews_scraper import fetch_hackernews_trending, afetch_hackernews_trending, enrich_hackernews_items
+from agent.producthunt_scraper import fetch_producthunt_today, afetch_producthunt_today
+from agent.summarizer import asummarize_items
+from agent.model_router import model_router
 from agent.newsletter_builder import build_newsletter
 from agent.email_sender import send_newsletter
-from agent.cache_manager import cached_request
-from agent.retry_handler import safe_execute, batch_execute, api_rate_limiter
+from agent.cache_manager import cache, cached_request, acached_request, await_for_refreshes, bypass_memo, AdaptiveTTL, NegativeCache
+from agent.http_client import create_async_client
+from agent.refresh_scheduler import RefreshAheadScheduler
+from agent.retry_handler import safe_execute, batch_execute
+
+# Failed or empty source fetches are retried after 1 minute, backing off to 15,
+# while the last good results keep being served
+SOURCE_NEGATIVE_CACHE = NegativeCache(ttl=60, max_ttl=900)
+
+# Seconds between sweeps of unusable cache entries while refreshing ahead
+CACHE_SWEEP_INTERVAL = 3600
+
+# Items in the newsletter, plus extra candidates summarized in case some summaries fail
+NEWSLETTER_ITEMS = 12
+SUMMARY_OVERFETCH = 4
+
+# Content sources: cache key, sync and async fetchers, and how long results are cached
+# (ttl is the starting TTL; ttl_policy adapts it to how often each source really changes).
+# Fetchers run under bypass_memo, so refreshing a source always reaches upstream.
+CONTENT_SOURCES = [
+    {
+        'name': "YouTube", 'key': "youtube_trending", 'ttl': 1800, 'ttl_policy': AdaptiveTTL(900, 7200),
+        'fetch': lambda: fetch_youtube_trending(max_results=2),
+        'afetch': lambda client: afetch_youtube_trending(max_results=2)
+    },
+    {
+        'name': "Reddit", 'key': "reddit_multi", 'ttl': 1800, 'ttl_policy': AdaptiveTTL(300, 3600),
+        'fetch': lambda: fetch_multiple_subreddits(limit_per_sub=2),
+        'afetch': lambda client: afetch_multiple_subreddits(limit_per_sub=2, client=client)
+    },
+    {
+        'name': "Twitter", 'key': "twitter_trending", 'ttl': 1800, 'ttl_policy': AdaptiveTTL(600, 3600),
+        'fetch': lambda: fetch_twitter_trending(limit=2),
+        'afetch': lambda client: afetch_twitter_trending(limit=2)
+    },
+    {
+        'name': "TikTok", 'key': "tiktok_trending", 'ttl': 1800, 'ttl_policy': AdaptiveTTL(900, 7200),
+        'fetch': lambda: fetch_tiktok_trending(limit=2),
+        'afetch': lambda client: afetch_tiktok_trending(limit=2)
+    },
+    {
+        'name': "GitHub", 'key': "github_trending", 'ttl': 3600, 'ttl_policy': AdaptiveTTL(1800, 21600),
+        'fetch': lambda: fetch_github_trending(limit=2),
+        'afetch': lambda client: afetch_github_trending(limit=2, client=client)
+    },
+    {
+        'name': "Hacker News", 'key': "hackernews_trending", 'ttl': 1800, 'ttl_policy': AdaptiveTTL(300, 3600),
+        'fetch': lambda: fetch_hackernews_trending(limit=2),
+        'afetch': lambda client: afetch_hackernews_trending(limit=2, client=client)
+    },
+    {
+        'name': "Product Hunt", 'key': "producthunt_today", 'ttl': 3600, 'ttl_policy': AdaptiveTTL(1800, 21600),
+        'fetch': lambda: fetch_producthunt_today(limit=2),
+        'afetch': lambda client: afetch_producthunt_today(limit=2)
+    }
+]
 
 def fetch_all_content():
     """Fetch content from all sources with error handling and caching"""
     
-    # Define fetch functions for each source
+    # Stale results (up to one TTL past expiry) are served while they refresh in the background
     fetch_functions = [
-        lambda: cached_request("youtube_trending", lambda: fetch_youtube_trending(max_results=2), ttl=1800),
-        lambda: cached_request("reddit_multi", lambda: fetch_multiple_subreddits(limit_per_sub=2), ttl=1800),
-        lambda: cached_request("twitter_trending", lambda: fetch_twitter_trending(limit=2), ttl=1800),
-        lambda: cached_request("tiktok_trending", lambda: fetch_tiktok_trending(limit=2), ttl=1800),
-        lambda: cached_request("github_trending", lambda: fetch_github_trending(limit=2), ttl=3600),
-        lambda: cached_request("hackernews_trending", lambda: fetch_hackernews_trending(limit=2), ttl=1800),
-        lambda: cached_request("producthunt_today", lambda: fetch_producthunt_today(limit=2), ttl=3600)
+        lambda source=source: cached_request(source['key'], bypass_memo(source['fetch']), ttl=source['ttl'],
+                                             stale_ttl=source['ttl'], ttl_policy=source['ttl_policy'],
+                                             negative_cache=SOURCE_NEGATIVE_CACHE)
+        for source in CONTENT_SOURCES
     ]
     
-    # Execute all fetch functions with error handling
-    results = batch_execute(fetch_functions, continue_on_error=True)
+    # Execute all fetch functions concurrently with error handling
+    results = batch_execute(fetch_functions, continue_on_error=True, parallel=True,
+                            task_timeout=120, timeout=300)
     
-    # Flatten and combine all results
-    all_content = []
-    source_names = ["YouTube", "Reddit", "Twitter", "TikTok", "GitHub", "Hacker News", "Product Hunt"]
+    return _combine_results(results)
+
+async def afetch_all_content():
+    """Fetch content from all sources on one event loop with a shared HTTP client"""
+    
+    async with create_async_client() as client:
+        fetch_coroutines = [
+            acached_request(source['key'], bypass_memo(lambda source=source: source['afetch'](client)),
+                            ttl=source['ttl'], stale_ttl=source['ttl'], ttl_policy=source['ttl_policy'],
+                            negative_cache=SOURCE_NEGATIVE_CACHE)
+            for source in CONTENT_SOURCES
+        ]
+        
+        results = await asyncio.gather(*fetch_coroutines, return_exceptions=True)
+        
+        # Stale entries are refreshed on this loop with this client, so let those refreshes finish first
+        await await_for_refreshes(60)
     
     for i, result in enumerate(results):
+        if isinstance(result, Exception):
+            print(f"Function {i} failed: {str(result)}")
+    
+    return _combine_results([None if isinstance(result, Exception) else result for result in results])
+
+def _combine_results(results):
+    """Flatten per-source results into one list, logging each source's outcome"""
+    all_content = []
+    
+    for source, result in zip(CONTENT_SOURCES, results):
         if result:
-            print(f"✓ Fetched {len(result)} items from {source_names[i]}")
+            print(f"✓ Fetched {len(result)} items from {source['name']}")
             all_content.extend(result)
         else:
-            print(f"✗ Failed to fetch from {source_names[i]}")
+            print(f"✗ Failed to fetch from {source['name']}")
     
     return all_content
 
+def run_refresh_ahead():
+    """Keep every source's cache entry warm until interrupted, so newsletter runs hit the cache"""
+    scheduler = RefreshAheadScheduler(
+        refresh_fraction=float(os.getenv("REFRESH_AHEAD_FRACTION", "0.8")),
+        max_concurrency=int(os.getenv("REFRESH_AHEAD_CONCURRENCY", "2"))
+    )
+    for source in CONTENT_SOURCES:
+        scheduler.register(source['key'], bypass_memo(source['fetch']), source['ttl'], stale_ttl=source['ttl'],
+                           ttl_policy=source['ttl_policy'], negative_cache=SOURCE_NEGATIVE_CACHE)
+    
+    print(f"🔄 Refreshing {len(CONTENT_SOURCES)} sources ahead of expiry (Ctrl+C to stop)...")
+    scheduler.start()
+    try:
+        last_sweep = 0
+        while True:
+            if time.time() - last_sweep >= CACHE_SWEEP_INTERVAL:
+                cache.clear_expired()
+                last_sweep = time.time()
+            time.sleep(60)
+    except KeyboardInterrupt:
+        print("Stopping refresh-ahead scheduler...")
+    finally:
+        scheduler.stop()
+
+def _summary_context(item):
+    """Build the text summarized for an item, based on its source"""
+    source = item.get('source', 'unknown')
+    if source == 'youtube':
+        context = f"YouTube Video: {item['title']} | Channel: {item.get('channel', 'Unknown')}"
+    elif source == 'reddit':
+        context = f"Reddit Post: {item['title']} | r/{item.get('subreddit', 'unknown')}"
+    elif source == 'github':
+        context = f"GitHub Repository: {item['title']} | Language: {item.get('language', 'Unknown')}"
+    elif source == 'hackernews':
+        context = f"Hacker News: {item['title']} | Comments: {item.get('comments', 0)}"
+        if item.get('comment_excerpts'):
+            context += " | Top comments: " + " / ".join(item['comment_excerpts'])
+    else:
+        context = f"{source.title()}: {item['title']}"
+    return context
+
+def _engagement(item):
+    return item.get('score', item.get('views', 0))
+
+def select_top_items(content_items, count=NEWSLETTER_ITEMS):
+    """Highest-engagement items, best first, without sorting every candidate"""
+    return heapq.nlargest(count, content_items, key=_engagement)
+
 def process_content(content_items):
-    """Process and summarize content items"""
+    """
+    Pick the newsletter's top items and summarize them
+    
+    Items are ranked by engagement (views/score) before any summarizing, and
+    only the top NEWSLETTER_ITEMS plus SUMMARY_OVERFETCH spares are
+    summarized. Spares replace top items whose summary fell back locally.
+    """
+    candidates = select_top_items(content_items, NEWSLETTER_ITEMS + SUMMARY_OVERFETCH)
+    print(f"🏆 Summarizing the top {len(candidates)} of {len(content_items)} items")
+    
+    # Optionally add top comment excerpts to Hacker News items for richer summaries
+    if os.getenv("HN_COMMENT_ENRICHMENT") == "1":
+        candidates = enrich_hackernews_items(candidates)
+    
+    # Summarize everything at once so repeated and previously seen contexts skip the API;
+    # the remaining requests run concurrently within the SUMMARY_* limits and deadline, each
+    # on the model tier picked for its length and source
+    contexts = [_summary_context(item) for item in candidates]
+    sources = [item.get('source') for item in candidates]
+    results = safe_execute(lambda: asyncio.run(asummarize_items(contexts, sources)), fallback_value=[None] * len(contexts))
+    
+    fallbacks = [result['fallback_reason'] for result in results if result and result['source'] == "fallback"]
+    if fallbacks:
+        reasons = ", ".join(f"{reason}: {fallbacks.count(reason)}" for reason in sorted(set(fallbacks)))
+        print(f"⚠️ {len(fallbacks)}/{len(results)} summaries used the local fallback ({reasons})")
+    
+    # Model and latency per item, then per model for this run
+    for item, result in zip(candidates, results):
+        if result:
+            print(f"   {result['source']:<8} {result['model'] or '-':<12} {result['latency']:5.1f}s  "
+                  f"{item.get('source', 'unknown')}: {item['title'][:60]}")
+    
+    used = [result['model'] for result in results if result and result['source'] != "cache"]
+    for model, stats in model_router.info().items():
+        p90 = f"{stats['p90_latency']:.1f}s" if stats['p90_latency'] is not None else "n/a"
+        demoted = " (demoted)" if stats['demoted'] else ""
+        print(f"🧭 {model}: {used.count(model)} items in {stats['requests']} requests, "
+              f"mean {stats['mean_latency']:.1f}s, p90 {p90}{demoted}")
+    
     summarized_content = []
+    spares = []
     
-    for item in content_items:
-        # Use rate limiting for AI summarization
-        api_rate_limiter.wait_if_needed()
-        
-        # Create context based on source
-        source = item.get('source', 'unknown')
-        if source == 'youtube':
-            context = f"YouTube Video: {item['title']} | Channel: {item.get('channel', 'Unknown')}"
-        elif source == 'reddit':
-            context = f"Reddit Post: {item['title']} | r/{item.get('subreddit', 'unknown')}"
-        elif source == 'github':
-            context = f"GitHub Repository: {item['title']} | Language: {item.get('language', 'Unknown')}"
-        elif source == 'hackernews':
-            context = f"Hacker News: {item['title']} | Comments: {item.get('comments', 0)}"
-        else:
-            context = f"{source.title()}: {item['title']}"
+    for item, result in zip(candidates, results):
+        summary = result['summary'] if result else None
         
-        # Summarize with error handling
-        summary = safe_execute(
-            lambda: summarize_text(context),
-            fallback_value=item['title'][:100] + "..." if len(item['title']) > 100 else item['title']
-        )
+        # Fall back to the title if summarization failed
+        if not summary:
+            summary = item['title'][:100] + "..." if len(item['title']) > 100 else item['title']
         
         # Standardize the data structure
-        summarized_content.append({
+        entry = {
             "summary": summary,
             "url": item['url'],
-            "views": item.get('score', item.get('views', 0)),
-            "source": source
-        })
+            "views": _engagement(item),
+            "source": item.get('source', 'unknown')
+        }
+        
+        # Items without an LLM summary only make the cut if there aren't enough others
+        if result and result['source'] != "fallback":
+            summarized_content.append(entry)
+        else:
+            spares.append(entry)
     
-    # Sort by engagement (views/score) and return top items
-    summarized_content.sort(key=lambda x: x['views'], reverse=True)
-    return summarized_content[:12]  # Top 12 items for newsletter
+    # Candidates are already in engagement order; refill from the spares and restore it
+    selected = summarized_content[:NEWSLETTER_ITEMS] + spares[:max(0, NEWSLETTER_ITEMS - len(summarized_content))]
+    selected.sort(key=lambda x: x['views'], reverse=True)
+    return selected
 
 if __name__ == "__main__":
+    # --refresh-ahead runs as a background cache warmer instead of sending a newsletter
+    if "--refresh-ahead" in sys.argv:
+        run_refresh_ahead()
+        exit(0)
+    
     print("🚀 Starting JDX Pulse content aggregation...")
     
-    # Fetch content from all sources
-    all_content = fetch_all_content()
+    # Drop cache entries past their stale window before fetching; last good source
+    # snapshots and entries with validators are kept longer (see CacheManager.clear_expired)
+    cache.clear_expired()
+    
+    # Fetch content from all sources (JDX_ASYNC_FETCH=1 uses the async driver)
+    if os.getenv("JDX_ASYNC_FETCH") == "1":
+        all_content = asyncio.run(afetch_all_content())
+    else:
+        all_content = fetch_all_content()
     print(f"📊 Total items fetched: {len(all_content)}")
     
     if not all_content:
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import os
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+# Recorded Algolia search responses (trimmed), one per page of the front page
+PAGES = [
+    {
+        "hits": [
+            {"objectID": "41000001", "title": "Show HN: A tiny SQLite browser", "url": "https://example.com/sqlite",
+             "points": 312, "num_comments": 87, "author": "alice", "created_at_i": 1760000000,
+             "_tags": ["story", "author_alice", "story_41000001", "front_page"]},
+            {"objectID": "41000002", "title": "Ask HN: How do you review large PRs?", "url": None,
+             "points": 145, "num_comments": 203, "author": "bob", "created_at_i": 1760000100,
+             "_tags": ["story", "author_bob", "story_41000002", "ask_hn", "front_page"]},
+            {"objectID": "41000003", "title": None, "url": "https://example.com/untitled",
+             "points": 90, "num_comments": 4, "author": "carol", "created_at_i": 1760000200,
+             "_tags": ["story", "author_carol", "story_41000003", "front_page"]}
+        ],
+        "nbHits": 5, "page": 0, "nbPages": 2, "hitsPerPage": 3
+    },
+    {
+        "hits": [
+            {"objectID": "41000004", "title": "The economics of cache invalidation", "url": "https://example.com/cache",
+             "points": 77, "num_comments": None, "author": "dave", "created_at_i": 1760000300,
+             "_tags": ["story", "author_dave", "story_41000004", "front_page"]},
+            {"objectID": "41000005", "title": "Rust in the kernel, one year on", "url": "https://example.com/rust",
+             "points": 64, "num_comments": 31, "author": "erin", "created_at_i": 1760000400,
+             "_tags": ["story", "author_erin", "story_41000005", "front_page"]}
+        ],
+        "nbHits": 5, "page": 1, "nbPages": 2, "hitsPerPage": 3
+    }
+]
+
+requests_seen = []
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        params = {name: values[0] for name, values in parse_qs(url.query).items()}
+        requests_seen.append((url.path, params))
+
+        page = int(params.get('page', 0))
+        payload = json.dumps(PAGES[page] if page < len(PAGES) else dict(PAGES[0], hits=[], page=page)).encode()
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+
+os.environ['HN_ALGOLIA_URL'] = f"http://127.0.0.1:{server.server_port}/api/v1"
+
+# Called below the memoized fetchers so cached results can't answer in place of the stub
+from agent.hackernews_scraper import _fetch_algolia_stories, _afetch_algolia_stories
+from agent.http_client import create_async_client
+
+async def fetch_async(list_name, limit):
+    async with create_async_client() as client:
+        return await _afetch_algolia_stories(list_name, limit, client)
+
+def run(name, fetch, list_name, limit):
+    requests_seen.clear()
+    stories = fetch(list_name, limit)
+    print(f"{name}: {len(stories)} stories in {len(requests_seen)} request(s)")
+    for story in stories:
+        print(f"  {story['id']} {story['title']} ({story['score']} points, {story['comments']} comments)")
+    return stories
+
+try:
+    stories = run("Field mapping", _fetch_algolia_stories, "topstories", 2)
+    assert len(requests_seen) == 1
+    assert requests_seen[0][0] == "/api/v1/search" and requests_seen[0][1]['tags'] == "front_page"
+    assert stories[0] == {
+        "id": 41000001, "title": "Show HN: A tiny SQLite browser", "url": "https://example.com/sqlite",
+        "score": 312, "source": "hackernews", "comments": 87, "author": "alice", "time": 1760000000
+    }
+    assert stories[1]['url'] == "https://news.ycombinator.com/item?id=41000002"  # Ask HN has no url
+
+    stories = run("Paging via nbPages", _fetch_algolia_stories, "topstories", 10)
+    assert [params['page'] for _, params in requests_seen] == ["0", "1"]
+    assert [story['id'] for story in stories] == [41000001, 41000002, 41000004, 41000005]  # untitled hit skipped
+    assert stories[2]['comments'] == 0  # null num_comments
+
+    stories = run("Async paging", lambda list_name, limit: asyncio.run(fetch_async(list_name, limit)), "topstories", 10)
+    assert len(requests_seen) == 2 and [story['id'] for story in stories] == [41000001, 41000002, 41000004, 41000005]
+
+    stories = run("Stops once the limit is met", _fetch_algolia_stories, "topstories", 3)
+    assert len(requests_seen) == 2 and len(stories) == 3  # the untitled hit means page 1 is still needed
+
+    stories = run("New stories endpoint", _fetch_algolia_stories, "newstories", 1)
+    assert requests_seen[0][0] == "/api/v1/search_by_date" and requests_seen[0][1]['tags'] == "story"
+
+    print("All Algolia backend checks passed")
+except AssertionError:
+    print("Error: Algolia backend check failed")
+    raise
+finally:
+    server.shutdown()
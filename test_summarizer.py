@@ -0,0 +1,84 @@
+import json
+import os
+import re
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Local OpenAI-compatible stub: answers batch requests with {"summaries": {id: "Summary of <item text>"}}
+requests_seen = []
+stub_behaviour = {'drop_first': None, 'as_list': False}
+
+class StubHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        requests_seen.append(body)
+
+        items = re.findall(r'^\[(\w+)\] (.*)$', body['messages'][-1]['content'], re.M)
+        summaries = {item_id: f"Summary of {text}" for item_id, text in items}
+
+        # Leave one id out of the first response to exercise retries
+        if len(requests_seen) == 1 and stub_behaviour['drop_first'] in summaries:
+            del summaries[stub_behaviour['drop_first']]
+
+        if stub_behaviour['as_list']:
+            content = json.dumps([{"id": item_id, "summary": summary} for item_id, summary in reversed(summaries.items())])
+        else:
+            content = json.dumps({"summaries": summaries})
+
+        payload = json.dumps({
+            "id": "stub", "object": "chat.completion", "created": 0, "model": body['model'],
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0}
+        }).encode()
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+threading.Thread(target=server.serve_forever, daemon=True).start()
+
+os.environ['OPENAI_API_KEY'] = 'stub'
+os.environ['OPENAI_BASE_URL'] = f"http://127.0.0.1:{server.server_port}/v1"
+
+from agent.summarizer import summarize_batch
+
+def run(name, texts, **options):
+    requests_seen.clear()
+    summaries = summarize_batch(texts, **options)
+    print(f"{name}: {len(requests_seen)} request(s)")
+    for text, summary in zip(texts, summaries):
+        print(f"  {text} -> {summary}")
+    return summaries
+
+texts = [f"Item number {i}" for i in range(1, 6)]
+expected = [f"Summary of {text}" for text in texts]
+
+try:
+    summaries = run("One batch", texts)
+    assert len(requests_seen) == 1 and summaries == expected
+
+    stub_behaviour['drop_first'] = '3'
+    summaries = run("Missing item re-sent", texts)
+    assert len(requests_seen) == 2 and summaries == expected
+    assert len(re.findall(r'^\[', requests_seen[1]['messages'][-1]['content'], re.M)) == 1  # only the missing item
+    stub_behaviour['drop_first'] = None
+
+    summaries = run("Split by token budget", texts, token_budget=200)
+    assert len(requests_seen) > 1 and summaries == expected
+
+    stub_behaviour['as_list'] = True
+    summaries = run("Reordered list response", texts)
+    assert summaries == expected
+
+    print("All batch summarization checks passed")
+except AssertionError:
+    print("Error: batch summarization check failed")
+    raise
+finally:
+    server.shutdown()